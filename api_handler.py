@@ -1,14 +1,227 @@
-import google.generativeai as genai
+import threading
+import time
+from scheduler import RequestScheduler, INTERACTIVE, current_request
+from response_cache import make_key
+from coalescing import SingleFlight, MicroBatcher
+from image_pipeline import sniff_mime
+from metrics import metrics
+from resilience import ResilientCaller, TokenBucket
+from backends import Backend, ModelBackend
 
 
 class APIClient:
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
-
-    def get_response(self, user_input):
-        try:
-            response = self.model.generate_content(user_input)
-            return response.text
-        except Exception as e:
-            return f"Error contacting AI: {e}"
\ No newline at end of file
+    def __init__(self, api_key, model=None, max_concurrency=4, max_queue=32, cache=None, semantic_cache=None, lazy=False,
+                 batch_window=0.0, max_batch=16, timeout=30.0, retries=3, rate_limit=None, burst=None):
+        # `model` is a backends.Backend, or any object with generate_content (e.g.
+        # fake_backend.FakeModel) for offline use. Without one a Gemini backend is built by
+        # load_backend(); with lazy=True that is left to the caller, typically a background
+        # thread once the window is up, and requests wait for it.
+        self._api_key = api_key
+        self._backend = None
+        self._backend_error = None
+        self._backend_ready = threading.Event()
+        self._backend_lock = threading.Lock()
+        if model is not None:
+            self._backend = model if isinstance(model, Backend) else ModelBackend(model)
+            self._backend_ready.set()
+        elif not lazy:
+            self.load_backend()
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._scheduler = None
+        self._scheduler_lock = threading.Lock()
+        # Optional response_cache.ResponseCache and semantic_cache.SemanticCache;
+        # errors are never cached
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        # Identical questions in flight at the same time share one model call.
+        # With batch_window > 0, distinct blocking questions arriving within the window are
+        # sent together when the model supports it (a generate_batch(prompts) method).
+        self.single_flight = SingleFlight()
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._batcher = None
+        # Every model call goes through timeouts, jittered retries, the circuit breaker and,
+        # with rate_limit (calls per second), a token bucket. Failures raise
+        # resilience.BackendError rather than coming back as answer text.
+        limiter = TokenBucket(rate_limit, burst) if rate_limit else None
+        self.resilience = ResilientCaller(timeout=timeout, attempts=retries, limiter=limiter)
+
+    def load_backend(self):
+        with self._backend_lock:
+            if self._backend_ready.is_set():
+                return
+            try:
+                from backends import GeminiBackend
+                self._backend = GeminiBackend(self._api_key)
+            except Exception as e:
+                self._backend_error = e
+            finally:
+                self._backend_ready.set()
+
+    @property
+    def backend(self):
+        self._backend_ready.wait()
+        if self._backend is None:
+            raise RuntimeError(f"Model unavailable: {self._backend_error}")
+        return self._backend
+
+    @property
+    def scheduler(self):
+        # Started on first use so asyncio stays off the startup path
+        with self._scheduler_lock:
+            if self._scheduler is None:
+                self._scheduler = RequestScheduler(max_concurrency=self.max_concurrency, max_queue=self.max_queue)
+            return self._scheduler
+
+    @property
+    def batcher(self):
+        if self._batcher is None and self.batch_window > 0 and self.backend.supports_batch:
+            self._batcher = MicroBatcher(self.backend.generate_batch, self.batch_window, self.max_batch)
+        return self._batcher
+
+    def coalescing_stats(self):
+        batched = self._batcher.prompts - self._batcher.batches if self._batcher is not None else 0
+        return {
+            "upstream_calls": self.single_flight.upstream - batched,
+            "shared": self.single_flight.shared,
+            "batched": batched,
+            "saved": self.single_flight.shared + batched,
+        }
+
+    def _build_prompt(self, user_input, subject=None, context=None):
+        # context is an optional context_manager.ConversationContext for multi-turn prompts
+        history = context.render() if context is not None else ""
+        if not subject and not history:
+            return user_input
+        parts = [f"You are a friendly {subject or 'homework'} tutor helping a student with homework."]
+        if history:
+            parts.append(history)
+            parts.append(f"Student: {user_input}")
+        else:
+            parts.append(user_input)
+        return "\n\n".join(parts)
+
+    def _contents(self, prompt, image_bytes=None):
+        # Multimodal requests send the (already preprocessed) image inline after the text
+        if not image_bytes:
+            return prompt
+        return [prompt, {"mime_type": sniff_mime(image_bytes), "data": image_bytes}]
+
+    def _shareable(self, context):
+        # Only questions asked with no conversation yet are cached and shared between
+        # students; any later question is sent with its context and depends on it
+        return context is None or context.empty()
+
+    def _prepare(self, user_input, subject, context, image_bytes=None):
+        # (coalescing key, prompt, shareable), with the context rendered once. Questions with
+        # a conversation are only coalesced with the very same prompt, so no answer built
+        # from one student's context reaches another.
+        if self._shareable(context):
+            return make_key(user_input, subject, image_bytes), self._build_prompt(user_input, subject), True
+        prompt = self._build_prompt(user_input, subject, context)
+        return make_key(prompt, subject, image_bytes), prompt, False
+
+    def answer_key(self, user_input, subject=None, context=None):
+        # What an answer depends on: the question when it is shareable, else the whole prompt
+        return self._prepare(user_input, subject, context)[0]
+
+    def cached_response(self, user_input, subject=None, image_bytes=None, context=None):
+        # Returns the cached answer or None, without contacting the model.
+        # Exact matches are tried first, then paraphrases of earlier text-only questions.
+        # Questions asked within a conversation are never answered from the cache.
+        if not self._shareable(context):
+            return None
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.get(make_key(user_input, subject, image_bytes))
+        if cached is None and self.semantic_cache is not None and not image_bytes:
+            cached = self.semantic_cache.lookup(user_input, subject)
+        return cached
+
+    def _store_response(self, user_input, subject, text, image_bytes=None):
+        if self.cache is not None:
+            self.cache.put(make_key(user_input, subject, image_bytes), text)
+        if self.semantic_cache is not None and not image_bytes:
+            self.semantic_cache.add(user_input, subject, text)
+
+    def _generate(self, user_input, subject, prompt, store=True, image_bytes=None):
+        # One upstream call; runs once per group of identical in-flight questions
+        batcher = self.batcher if not image_bytes else None
+        contents = self._contents(prompt, image_bytes)
+
+        def attempt(timeout):
+            if batcher is not None:
+                return batcher.submit(prompt)
+            return self.backend.generate(contents, timeout)
+
+        with metrics.timer("api.upstream", subject or ""):
+            text = self.resilience.call(attempt)
+        if store:
+            self._store_response(user_input, subject, text, image_bytes)
+        return text
+
+    def _generate_stream(self, user_input, subject, prompt, store=True, image_bytes=None):
+        parts = []
+        contents = self._contents(prompt, image_bytes)
+        start = time.perf_counter()
+        for chunk in self.resilience.stream(lambda timeout: self.backend.stream(contents, timeout)):
+            if not parts:
+                metrics.observe("api.first_chunk", time.perf_counter() - start, subject or "")
+            parts.append(chunk)
+            yield chunk
+        metrics.observe("api.upstream", time.perf_counter() - start, subject or "")
+        if store:
+            self._store_response(user_input, subject, "".join(parts), image_bytes)
+
+    @metrics.timed("api.get_response")
+    def get_response(self, user_input, subject=None, check_cache=True, context=None, image_bytes=None):
+        # check_cache=False skips the lookup when the caller already missed; the answer is still stored.
+        # image_bytes should come from image_pipeline so uploads are small and cache keys stable.
+        # Raises resilience.BackendError (BackendUnavailable while the circuit is open).
+        key, prompt, shareable = self._prepare(user_input, subject, context, image_bytes)
+        cached = self.cached_response(user_input, subject, image_bytes) if check_cache and shareable else None
+        if cached is not None:
+            return cached
+        return self.single_flight.do(
+            key, lambda: self._generate(user_input, subject, prompt, store=shareable, image_bytes=image_bytes))
+
+    def stream_response(self, user_input, subject=None, check_cache=True, context=None, image_bytes=None):
+        # Yields pieces of the answer as the model produces them; raises like get_response
+        key, prompt, shareable = self._prepare(user_input, subject, context, image_bytes)
+        cached = self.cached_response(user_input, subject, image_bytes) if check_cache and shareable else None
+        if cached is not None:
+            yield cached
+            return
+        chunks = self.single_flight.stream(
+            key, lambda: self._generate_stream(user_input, subject, prompt, store=shareable, image_bytes=image_bytes))
+        for chunk in chunks:
+            request = current_request()
+            if request is not None and request.cancelled():
+                chunks.close()
+                return
+            yield chunk
+
+    # === Scheduling ===
+
+    def submit(self, func, *args, priority=INTERACTIVE):
+        """Run func(*args) on the request scheduler; returns a ScheduledRequest.
+
+        Raises scheduler.QueueFullError when too many requests are waiting.
+        """
+        return self.scheduler.submit(func, *args, priority=priority)
+
+    def cancel(self, request_id):
+        return self.scheduler.cancel(request_id)
+
+    def queue_depth(self):
+        return self._scheduler.queue_depth() if self._scheduler is not None else 0
+
+    def in_flight(self):
+        return self._scheduler.in_flight() if self._scheduler is not None else 0
+
+    def close(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,56 @@
+# backends.py
+# Model backends behind APIClient: the interface, Gemini, and an adapter for model-like objects
+
+
+class Backend:
+    """What APIClient needs from a model.
+
+    `contents` is a prompt string, or a list of a prompt and inline image
+    parts ({"mime_type", "data"}). `timeout` is in seconds. Errors are raised
+    as-is; resilience.is_transient decides which are retried.
+    """
+
+    name = "backend"
+    # Backends that can answer several prompts in one call set this and implement generate_batch
+    supports_batch = False
+
+    def generate(self, contents, timeout=None):
+        """The whole answer as a string."""
+        raise NotImplementedError
+
+    def stream(self, contents, timeout=None):
+        """Iterator over pieces of the answer, as they are produced."""
+        raise NotImplementedError
+
+    def generate_batch(self, prompts):
+        raise NotImplementedError
+
+
+class ModelBackend(Backend):
+    # Adapts anything with GenerativeModel's generate_content(contents, stream, request_options)
+
+    def __init__(self, model, name=None):
+        self.model = model
+        self.name = name or type(model).__name__
+        self.supports_batch = hasattr(model, "generate_batch")
+
+    def generate(self, contents, timeout=None):
+        return self.model.generate_content(contents, request_options={"timeout": timeout}).text
+
+    def stream(self, contents, timeout=None):
+        for chunk in self.model.generate_content(contents, stream=True, request_options={"timeout": timeout}):
+            if chunk.text:
+                yield chunk.text
+
+    def generate_batch(self, prompts):
+        return self.model.generate_batch(prompts)
+
+
+class GeminiBackend(ModelBackend):
+    # Imports the SDK when built, so construct it off the startup path (see APIClient.load_backend)
+
+    def __init__(self, api_key, model_name="gemini-1.5-flash"):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        # One model (and its pooled connection) is shared by every worker thread
+        super().__init__(genai.GenerativeModel(model_name), name=f"gemini:{model_name}")
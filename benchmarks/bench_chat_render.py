@@ -0,0 +1,75 @@
+"""Load time and per-append latency of the chat view at large conversation sizes.
+
+Run from the repository root:  python benchmarks/bench_chat_render.py
+Needs a display (use xvfb-run on a headless box).
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SIZES = [10_000, 50_000, 100_000]
+SAMPLES = 200
+
+
+def make_gui():
+    import tkinter as tk
+    from api_handler import APIClient
+    from fake_backend import FakeModel
+    from gui import TutorBotGUI
+    from user_profile import UserProfile
+
+    # Run in a scratch directory so no last_session.json is picked up
+    os.chdir(tempfile.mkdtemp())
+    try:
+        app = TutorBotGUI(api_client=APIClient(None, model=FakeModel()), user=UserProfile("bench"))
+    except tk.TclError as e:
+        print(f"Cannot open a Tk window ({e}); run under xvfb-run.")
+        sys.exit(1)
+    app.root.withdraw()
+    app.notification_sound.set(False)
+    return app
+
+
+def bench_size(app, size):
+    app.conversation.replace(
+        {"sender": "You" if i % 2 else "Bot", "text": f"Message number {i} about fractions", "time": "12:00:00"}
+        for i in range(size - SAMPLES)
+    )
+    start = time.perf_counter()
+    app._refresh_chat()
+    app.root.update()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for i in range(SAMPLES):
+        start = time.perf_counter()
+        app._append_message("You", f"Appended message {i}")
+        app.root.update_idletasks()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "load_ms": load_ms,
+        "median_ms": statistics.median(timings),
+        "p99_ms": timings[int(len(timings) * 0.99) - 1],
+        "max_ms": timings[-1],
+    }
+
+
+def main():
+    app = make_gui()
+    for windowed in (True, False):
+        app.virtual_view.set(windowed)
+        print("windowed view" if windowed else "full view")
+        print(f"{'messages':>10} {'load ms':>10} {'median ms':>10} {'p99 ms':>10} {'max ms':>10}")
+        for size in SIZES:
+            r = bench_size(app, size)
+            print(f"{size:>10} {r['load_ms']:>10.1f} {r['median_ms']:>10.3f} {r['p99_ms']:>10.3f} {r['max_ms']:>10.3f}")
+    app.root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Upstream calls saved by request coalescing under a synthetic burst.
+
+Run from the repository root:  python benchmarks/bench_coalescing.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_handler import APIClient
+from fake_backend import FakeModel
+
+BURST = 200
+
+
+def burst(api, questions, stream=False):
+    # Everyone asks at the same moment, like a class hitting the same quick reply
+    start_line = threading.Barrier(len(questions))
+
+    def ask(question):
+        start_line.wait()
+        if stream:
+            "".join(api.stream_response(question, "Math"))
+        else:
+            api.get_response(question, "Math")
+
+    threads = [threading.Thread(target=ask, args=(q,)) for q in questions]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def report(label, api, elapsed):
+    stats = api.coalescing_stats()
+    print(f"{label:<34} requests={BURST:<4} upstream={api.backend.model.calls:<4} "
+          f"shared={stats['shared']:<4} batched={stats['batched']:<4} saved={stats['saved']:<4} time={elapsed * 1000:.0f}ms")
+
+
+def main():
+    hot = [f"Can you help with math? ({i % 5})" for i in range(BURST)]
+    distinct = [f"Question number {i} about fractions" for i in range(BURST)]
+
+    api = APIClient(None, model=FakeModel(first_delay=0.2))
+    report("5 hot questions, blocking", api, burst(api, hot))
+
+    api = APIClient(None, model=FakeModel(first_delay=0.2))
+    report("5 hot questions, streaming", api, burst(api, hot, stream=True))
+
+    api = APIClient(None, model=FakeModel(first_delay=0.2))
+    report("200 distinct, no batching", api, burst(api, distinct))
+
+    api = APIClient(None, model=FakeModel(first_delay=0.2), batch_window=0.02, max_batch=16)
+    report("200 distinct, 20 ms batch window", api, burst(api, distinct))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Memory footprint of conversation storage at 1M messages.
+
+Compares the previous representation (a list of dicts with "HH:MM:SS"
+strings, plus the profile's own question/response copies) against
+MessageStore, in memory and with old texts spilled to disk.
+
+Run from the repository root:  python benchmarks/bench_message_store.py [messages]
+"""
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_store import MessageStore
+from user_profile import UserProfile
+
+WORDS = "the fraction numerator denominator add photosynthesis energy cell equation solve variable".split()
+
+
+def texts(n, seed=3):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+
+
+def measure(label, build, n):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    keep = build(n)
+    elapsed = time.perf_counter() - start
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:<34} {current / 1e6:>8.1f} MB {current / n:>7.0f} B/msg {n / elapsed:>12,.0f} msg/s")
+    return keep
+
+
+def dicts(n):
+    # What gui.py and UserProfile held before: every message dict plus a history copy per turn
+    conversation, history = [], []
+    now = time.strftime("%H:%M:%S")
+    for i, text in enumerate(texts(n)):
+        conversation.append({"sender": "You" if i % 2 == 0 else "Bot", "text": text, "time": now})
+        if i % 2:
+            history.append({"question": conversation[-2]["text"], "response": text})
+    return conversation, history
+
+
+def store(n, max_in_memory=None):
+    user = UserProfile("bench", messages=MessageStore(max_in_memory=max_in_memory))
+    messages = user.messages
+    question = None
+    for i, text in enumerate(texts(n)):
+        index = messages.append("You" if i % 2 == 0 else "Bot", text)
+        if i % 2:
+            user._turns.extend((question, index))
+        question = index
+    return user
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{n:,} messages (texts of 5-40 words; text storage is included)")
+    measure("list of dicts + history copies", dicts, n)
+    measure("MessageStore", store, n)
+    user = measure("MessageStore, 20k texts in memory", lambda n: store(n, 20_000), n)
+
+    start = time.perf_counter()
+    for i in random.Random(1).sample(range(n), 1000):
+        user.messages[i]
+    print(f"\nrandom access, spilled store: {(time.perf_counter() - start) * 1000:.2f} us/message")
+    start = time.perf_counter()
+    count = sum(1 for _ in user.messages)
+    print(f"sequential scan, spilled store: {count / (time.perf_counter() - start):,.0f} messages/s")
+    user.messages.close()
+
+
+if __name__ == "__main__":
+    main()
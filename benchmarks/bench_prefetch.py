@@ -0,0 +1,104 @@
+"""Answer latency with and without speculative prefetching, over a scripted student session.
+
+After each answer the student reads for a while, then sends a quick reply,
+a generic follow-up or a new question. The same seeded session is run with
+prefetching off and on, against a fake model, and the answer latency, prefetch
+hit rate and tokens spent on speculation are compared.
+
+Run from the repository root:  python benchmarks/bench_prefetch.py
+"""
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_handler import APIClient
+from context_manager import ConversationContext, estimate_tokens
+from fake_backend import FakeModel
+from prefetch import FOLLOW_UPS, Prefetcher
+from question_logic import QuestionRouter
+from response_cache import ResponseCache
+
+QUICK_REPLIES = ["Hello!", "Thanks!", "Can you help with math?", "Science question", "Explain history"]
+TOPICS = ["fractions", "slope", "photosynthesis", "gravity", "the Roman empire", "metaphors", "atoms", "the water cycle"]
+TURNS = 25
+READ_SECONDS = 1.5  # time between an answer and the next question
+SUBJECT = "Math"
+
+
+def session(rng):
+    # The same mix for both runs: ~40% quick replies, ~30% follow-ups, the rest new questions
+    questions = []
+    for i in range(TURNS):
+        roll = rng.random()
+        if roll < 0.4:
+            questions.append(rng.choice(QUICK_REPLIES))
+        elif roll < 0.7 and i:
+            questions.append(rng.choice(FOLLOW_UPS))
+        else:
+            questions.append(f"How does {rng.choice(TOPICS)} work? ({i})")
+    return questions
+
+
+def run(questions, prefetch):
+    scratch = tempfile.mkdtemp()
+    model = FakeModel(first_delay=0.25, chunk_delay=0.005, latency="lognormal", jitter=0.3, seed=7)
+    api = APIClient(None, model=model, cache=ResponseCache(os.path.join(scratch, "cache.db")))
+    prefetcher = Prefetcher(api)
+    router = QuestionRouter()
+    context = ConversationContext()
+    latencies = []
+    asked_tokens = 0
+    try:
+        for text in questions:
+            start = time.perf_counter()
+            route = router.route(text, SUBJECT)
+            answer = route.answer
+            if answer is None:
+                answer = api.cached_response(text, route.subject, context=context)
+            if answer is None:
+                answer = prefetcher.take(text, route.subject, context) if prefetch else None
+                if answer is None:
+                    answer = api.get_response(text, route.subject, context=context)
+                    asked_tokens += estimate_tokens(context.render()) + estimate_tokens(text) + estimate_tokens(answer)
+            latencies.append(time.perf_counter() - start)
+            context.add_turn(text, answer)
+            if prefetch:
+                # What the GUI does once the answer is shown
+                candidates = []
+                for candidate in QUICK_REPLIES + list(FOLLOW_UPS):
+                    candidate_route = router.route(candidate, SUBJECT, record=False)
+                    if candidate_route.answer is None:
+                        candidates.append((candidate, candidate_route.subject))
+                prefetcher.prefetch(candidates, context)
+            time.sleep(READ_SECONDS)
+        return latencies, prefetcher.stats(), asked_tokens, model.calls
+    finally:
+        prefetcher.cancel()
+        api.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def main():
+    questions = session(random.Random(3))
+    print(f"{TURNS} questions, {READ_SECONDS}s reading between answers")
+    for prefetch in (False, True):
+        latencies, stats, asked_tokens, calls = run(questions, prefetch)
+        latencies.sort()
+        label = "prefetch on " if prefetch else "prefetch off"
+        print(f"{label}: median {statistics.median(latencies) * 1000:6.1f} ms, "
+              f"p90 {latencies[int(len(latencies) * 0.9)] * 1000:6.1f} ms, "
+              f"total wait {sum(latencies):5.2f} s, {calls} model calls")
+        if prefetch:
+            print(f"  hit rate {stats['hit_rate']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']}), "
+                  f"{stats['requests']} speculative calls, {stats['tokens']} speculative tokens "
+                  f"vs {asked_tokens} for questions asked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Classification throughput of question_logic and the share of traffic answered locally.
+
+Run from the repository root:  python benchmarks/bench_question_router.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_logic import QuestionRouter
+
+# A rough traffic mix: quick replies, homework questions, arithmetic and conversions
+TRAFFIC = [
+    ("Hello!", 10), ("Thanks!", 8), ("Can you help with math?", 6), ("Science question", 4), ("Explain history", 4),
+    ("What is 12 * (3 + 4)?", 5), ("2^10", 2), ("144 / 12", 3), ("convert 5 km to miles", 2), ("100 F to C", 1),
+    ("How do I add fractions with different denominators?", 8), ("Explain photosynthesis", 6),
+    ("What caused World War 1?", 5), ("What is a metaphor?", 4), ("Solve 2x + 3 = 11", 5),
+    ("Can you check the grammar in my essay introduction?", 4), ("Why do objects fall at the same rate?", 4),
+    ("Who was the first emperor of Rome?", 3), ("What is the area of a triangle with base 4 and height 6?", 4),
+]
+N = 200_000
+
+
+def main():
+    rng = random.Random(0)
+    questions, weights = zip(*TRAFFIC)
+    sample = rng.choices(questions, weights, k=N)
+
+    router = QuestionRouter()
+    start = time.perf_counter()
+    for question in sample:
+        router.classify(question)
+    classify_rate = N / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for question in sample:
+        router.route(question)
+    route_rate = N / (time.perf_counter() - start)
+
+    stats = router.stats()
+    print(f"classify: {classify_rate:,.0f} questions/s")
+    print(f"route:    {route_rate:,.0f} questions/s")
+    print(f"answered locally: {stats['local_share']:.1%} of {stats['total']:,}")
+    for kind in sorted(k for k in stats if k not in ("total", "local", "local_share")):
+        print(f"  {kind:<11} {stats[kind]:>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Behaviour of the resilience layer against a fault-injecting fake backend.
+
+Scenarios: transient errors, hung calls hitting the timeout, and a full
+outage that trips the circuit breaker and recovers. Reports answers
+delivered, upstream calls, retries, breaker trips and latency.
+
+Run from the repository root:  python benchmarks/bench_resilience.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_handler import APIClient
+from fake_backend import FakeModel
+from resilience import BackendError, BackendUnavailable, CircuitBreaker
+
+USERS = 20
+QUESTIONS = 10
+
+
+def run(label, model, outage=None, **client_args):
+    api = APIClient(None, model=model, **client_args)
+    api.resilience.backoff_base = 0.05
+    api.resilience.breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.5)
+    results = {"ok": 0, "failed": 0, "fast_failed": 0}
+    latencies = []
+    lock = threading.Lock()
+
+    def student(n):
+        for q in range(QUESTIONS):
+            start = time.perf_counter()
+            try:
+                api.get_response(f"student {n} question {q}", "Math")
+                outcome = "ok"
+            except BackendUnavailable:
+                outcome = "fast_failed"
+                time.sleep(0.1)  # the student waits a moment before asking again
+            except BackendError:
+                outcome = "failed"
+            with lock:
+                results[outcome] += 1
+                latencies.append(time.perf_counter() - start)
+            time.sleep(0.02)
+
+    if outage:
+        model.outage(outage)
+    threads = [threading.Thread(target=student, args=(n,)) for n in range(USERS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    stats = api.resilience.stats()
+    print(f"{label:<28} ok={results['ok']:<4} failed={results['failed']:<4} fast-failed={results['fast_failed']:<4} "
+          f"calls={model.calls:<4} retries={stats['retries']:<4} trips={stats['trips']:<2} "
+          f"p50={latencies[len(latencies) // 2] * 1000:>6.0f}ms p99={latencies[int(len(latencies) * 0.99)] * 1000:>6.0f}ms "
+          f"{elapsed:.1f}s")
+    api.close()
+
+
+def main():
+    print(f"{USERS} students x {QUESTIONS} questions")
+    run("healthy", FakeModel(first_delay=0.02, chunk_delay=0.001))
+    run("10% transient errors", FakeModel(first_delay=0.02, chunk_delay=0.001, error_rate=0.1, seed=1))
+    run("10% errors, no retries", FakeModel(first_delay=0.02, chunk_delay=0.001, error_rate=0.1, seed=1), retries=1)
+    run("5% hung calls, 0.2s timeout", FakeModel(first_delay=0.02, chunk_delay=0.001, hang_rate=0.05, seed=2), timeout=0.2)
+    run("0.5s outage", FakeModel(first_delay=0.02, chunk_delay=0.001), outage=0.5)
+    run("rate limited to 50/s", FakeModel(first_delay=0.02, chunk_delay=0.001), rate_limit=50)
+
+
+if __name__ == "__main__":
+    main()
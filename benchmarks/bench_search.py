@@ -0,0 +1,57 @@
+"""Index build time and query latency of search_index on large chat histories.
+
+Run from the repository root:  python benchmarks/bench_search.py
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+
+SIZE = 100_000
+WORDS = (
+    "fraction denominator numerator photosynthesis chlorophyll energy light plant cell history empire "
+    "war treaty revolution king queen poem metaphor simile verb noun equation variable solve graph slope "
+    "angle triangle atom molecule electron gravity force mass velocity the a of and to is in that it for"
+).split()
+QUERIES = ["energy", "photo", "e", '"light energy"', 'plant "the cell"', "treaty revolution", "zzz"]
+
+
+def make_messages(rng):
+    # Zipf-distributed words: a few very common ones and a long tail, like real chat text
+    vocab = WORDS + [f"word{i}" for i in range(5000)]
+    weights = [1 / rank for rank in range(1, len(vocab) + 1)]
+    return [" ".join(rng.choices(vocab, weights, k=rng.randint(5, 40))) for _ in range(SIZE)]
+
+
+def main():
+    rng = random.Random(0)
+    messages = make_messages(rng)
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for i, text in enumerate(messages):
+        index.add(i, text)
+    print(f"indexed {SIZE} messages in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':>22} {'matches':>8} {'median ms':>10}")
+    for query in QUERIES:
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            results = index.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{query:>22} {len(results):>8} {statistics.median(timings):>10.2f}")
+
+    # The old approach: lowercase and scan every message
+    start = time.perf_counter()
+    [i for i, text in enumerate(messages) if "energy" in text.lower()]
+    print(f"{'linear scan':>22} {'':>8} {(time.perf_counter() - start) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Semantic cache lookup latency as the vector index grows to 1M entries.
+
+Run from the repository root:  python benchmarks/bench_semantic_cache.py
+Needs NumPy; the 1M-entry index takes about 0.5 GB.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from semantic_cache import SemanticCache
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+QUERIES = 50
+QUESTIONS = [
+    "what is photosynthesis?",
+    "how do I add fractions with different denominators",
+    "why did the roman empire fall",
+    "explain the water cycle",
+    "what is a metaphor",
+]
+
+
+def main():
+    cache = SemanticCache(max_entries=SIZES[-1])
+    for q in QUESTIONS:
+        cache.add(q, "General", q.upper())
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        cache.embedder.embed(QUESTIONS[1])
+    embed_us = (time.perf_counter() - start) * 1000
+
+    # Fill the index with random unit vectors; embedding a million real prompts would dominate the run
+    rng = np.random.default_rng(0)
+    # Only questions with the same question words and numbers are compared; fill one such partition
+    partition = cache._partition(QUESTIONS[0], "General")
+    index = cache._indexes[partition]
+    queries = [q for q in QUESTIONS if cache._partition(q, "General") == partition]
+    print(f"embedding: {embed_us:.1f} us/question")
+    print(f"{'entries':>10} {'median ms':>10} {'max ms':>10} {'index MB':>10}")
+    for size in SIZES:
+        missing = size - index.size
+        while missing > 0:
+            batch = min(missing, 100_000)
+            vectors = rng.standard_normal((batch, index.dim), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            index.extend(vectors, [None] * batch)
+            missing -= batch
+
+        timings = []
+        for i in range(QUERIES):
+            start = time.perf_counter()
+            cache.lookup(queries[i % len(queries)], "General")
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{size:>10} {statistics.median(timings):>10.3f} {max(timings):>10.3f} {index.vectors.nbytes / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
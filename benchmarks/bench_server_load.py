@@ -0,0 +1,104 @@
+"""Load test of the headless server against the local fake model.
+
+Run from the repository root:  python benchmarks/bench_server_load.py [--stream]
+Each simulated student opens a session over a keep-alive HTTP connection and
+asks QUESTIONS questions back to back; reports p50/p99 latency and throughput.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_handler import APIClient
+from fake_backend import FakeModel
+from server import TutorServer
+
+SESSIONS = [100, 250, 500, 1000]
+QUESTIONS = 5
+MAX_CONCURRENCY = 64
+
+
+def start_server():
+    # The server gets its own loop thread so client work doesn't skew its timings
+    api = APIClient(None, model=FakeModel(first_delay=0.05, chunk_delay=0.002), max_concurrency=MAX_CONCURRENCY, max_queue=10_000)
+    server = TutorServer(api)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start(port=0))
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return server
+
+
+async def request(reader, writer, method, path, body):
+    data = json.dumps(body).encode("utf-8")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    headers = dict(line.split(": ", 1) for line in head.decode("latin-1").split("\r\n")[1:] if ": " in line)
+    if "Content-Length" in headers:
+        return json.loads(await reader.readexactly(int(headers["Content-Length"])))
+    return await reader.read()  # event stream: the server closes when done
+
+
+async def student(port, n, stream, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    session_id = (await request(reader, writer, "POST", "/sessions", {"name": f"student{n}"}))["session_id"]
+    for q in range(QUESTIONS):
+        if stream:
+            writer.close()
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        start = time.perf_counter()
+        reply = await request(reader, writer, "POST", f"/sessions/{session_id}/ask",
+                              {"question": f"question {n}-{q} about fractions", "subject": "Math", "stream": stream})
+        latencies.append(time.perf_counter() - start)
+        if isinstance(reply, dict) and "error" in reply:
+            errors.append(reply["error"])
+    writer.close()
+
+
+async def run_level(port, sessions, stream):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(student(port, n, stream, latencies, errors) for n in range(sessions)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "throughput": len(latencies) / elapsed,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stream", action="store_true", help="ask over text/event-stream instead of plain JSON")
+    args = parser.parse_args()
+
+    # Two sockets per student (client and server side) live in this process
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * SESSIONS[-1] + 256)), hard))
+
+    server = start_server()
+    print(f"fake model: 50 ms to first chunk, {MAX_CONCURRENCY} concurrent model calls")
+    print(f"{'sessions':>9} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}")
+    for sessions in SESSIONS:
+        r = asyncio.run(run_level(server.port(), sessions, args.stream))
+        print(f"{sessions:>9} {r['p50']:>9.1f} {r['p99']:>9.1f} {r['throughput']:>9.1f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
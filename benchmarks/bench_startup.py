@@ -0,0 +1,85 @@
+"""Startup cost: import-time report and time to first frame, checked against a budget.
+
+Run from the repository root:  python benchmarks/bench_startup.py
+The first-frame check needs a display (use xvfb-run on a headless box).
+Exits non-zero when a budget is exceeded.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = 150
+
+# Everything imported before the first frame (main.build_app imports the rest lazily)
+STARTUP_MODULES = ["main", "api_handler", "response_cache", "session_archive", "user_profile", "gui"]
+FIRST_FRAME_BUDGET_MS = 1000
+
+FIRST_FRAME_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import main
+app = main.build_app("benchmark-key")
+app.root.update()
+print("frame", flush=True)
+app.root.destroy()
+"""
+
+
+def import_report(modules=STARTUP_MODULES, top=10):
+    # Parses `python -X importtime` output: (self us, cumulative us, module name)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    # Top-level rows of our modules; anything they import is nested under them
+    ours = [r for r in rows if r[2].startswith(" ") and not r[2].startswith("  ") and r[2].strip() in modules]
+    total = sum(cum for _, cum, _ in ours)
+    print(f"startup imports: {total / 1000:.1f} ms (budget {IMPORT_BUDGET_MS} ms)")
+    first = rows.index(ours[0]) - 1
+    while first >= 0 and rows[first][2].startswith("  "):
+        first -= 1
+    # Slowest imports on the startup path (rows after interpreter start-up)
+    startup_rows = rows[first + 1:]
+    for self_us, cumulative_us, name in sorted(startup_rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    return total / 1000
+
+
+def time_to_first_frame():
+    # Wall time from process start until the window has been drawn once
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", FIRST_FRAME_SCRIPT.format(root=ROOT)],
+        cwd=tempfile.mkdtemp(), capture_output=True, text=True,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if "frame" not in proc.stdout:
+        print(f"first frame: skipped ({proc.stderr.strip().splitlines()[-1] if proc.stderr else 'no output'})")
+        return None
+    print(f"first frame: {elapsed:.0f} ms (budget {FIRST_FRAME_BUDGET_MS} ms)")
+    return elapsed
+
+
+def main():
+    over = False
+    import_ms = import_report()
+    over |= import_ms > IMPORT_BUDGET_MS
+    frame_ms = time_to_first_frame()
+    over |= frame_ms is not None and frame_ms > FIRST_FRAME_BUDGET_MS
+    if over:
+        print("startup budget exceeded")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Time-to-first-token vs. full-response latency against the local fake model.
+
+Run from the repository root:  python benchmarks/bench_streaming.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_handler import APIClient
+from fake_backend import FakeModel
+
+PROMPT = "Explain how to add fractions with different denominators"
+
+
+def main():
+    reply = lambda prompt: "Find a common denominator, convert both fractions, then add the numerators. " * 4
+    for first_delay, chunk_delay in [(0.05, 0.005), (0.2, 0.02), (0.5, 0.05)]:
+        api = APIClient(None, model=FakeModel(reply=reply, first_delay=first_delay, chunk_delay=chunk_delay))
+
+        start = time.perf_counter()
+        api.get_response(PROMPT)
+        blocking = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first = None
+        for _ in api.stream_response(PROMPT):
+            if first is None:
+                first = time.perf_counter() - start
+        total = time.perf_counter() - start
+
+        print(f"first_delay={first_delay:.3f}s chunk_delay={chunk_delay:.3f}s  "
+              f"blocking={blocking * 1000:.0f}ms  stream ttft={first * 1000:.0f}ms total={total * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Throughput and file size of the transcript formats.
+
+Writes and streams back a synthetic conversation in every format supported
+by transcript_io, and reports the peak memory of a streaming read.
+
+Run from the repository root:  python benchmarks/bench_transcript_io.py [messages]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transcript_io
+
+WORDS = ("the fraction numerator denominator add subtract photosynthesis energy cell "
+         "equation solve variable history war treaty because therefore example step").split()
+
+
+def make_conversation(n, seed=7):
+    rng = random.Random(seed)
+    for i in range(n):
+        sender = "You" if i % 2 == 0 else "Bot"
+        length = rng.randint(4, 12) if sender == "You" else rng.randint(20, 120)
+        text = " ".join(rng.choice(WORDS) for _ in range(length))
+        if sender == "Bot" and i % 5 == 1:
+            text += "\nStep 1: " + " ".join(rng.choice(WORDS) for _ in range(10))
+        yield {"sender": sender, "text": text, "time": f"{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}"}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    messages = list(make_conversation(n))
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{n} messages")
+        print(f"{'format':<8} {'size':>9} {'write msg/s':>12} {'read msg/s':>12} {'read peak':>10}")
+        for ext in transcript_io.FORMATS:
+            path = os.path.join(tmp, "conversation" + ext)
+            start = time.perf_counter()
+            transcript_io.write_messages(path, messages)
+            write = time.perf_counter() - start
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            count = sum(1 for _ in transcript_io.read_messages(path))
+            read = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert count == n, (ext, count)
+            print(f"{ext:<8} {os.path.getsize(path) / 1e6:>7.1f}MB {n / write:>12,.0f} {n / read:>12,.0f} "
+                  f"{peak / 1024:>8.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
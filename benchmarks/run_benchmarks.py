@@ -0,0 +1,285 @@
+"""Offline benchmark suite: the app's hot paths as comparable numbers.
+
+Everything runs against fake_backend.FakeModel (seeded, so runs repeat), so no
+network or API key is needed. Each case is warmed up, then timed for a number
+of rounds; the table shows min / median / p95 per call.
+
+Run from the repository root:
+    python benchmarks/run_benchmarks.py                      # all suites
+    python benchmarks/run_benchmarks.py -k search -k session # suites by name
+    python benchmarks/run_benchmarks.py --json results.json  # save the numbers
+    python benchmarks/run_benchmarks.py --compare results.json  # exit 1 on regressions
+The render suite needs a display; on a headless box run under xvfb-run, or it is skipped.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# A case is slower than the baseline when its median grew by more than this
+DEFAULT_THRESHOLD = 0.20
+WORDS = ("fraction denominator photosynthesis energy light plant cell history empire treaty poem "
+         "metaphor verb equation variable slope angle atom electron gravity force mass the a of and").split()
+
+
+class Skip(Exception):
+    pass
+
+
+class Runner:
+    def __init__(self, warmup=2, rounds_scale=1.0):
+        self.warmup = warmup
+        self.rounds_scale = rounds_scale
+        self.results = {}
+
+    def bench(self, name, fn, rounds=20):
+        # fn() is one timed call; the first `warmup` calls are not counted
+        timings = []
+        for i in range(self.warmup + max(1, int(rounds * self.rounds_scale))):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            if i >= self.warmup:
+                timings.append(elapsed)
+        return self.record(name, timings)
+
+    def record(self, name, timings):
+        timings = sorted(timings)
+        result = {
+            "rounds": len(timings),
+            "min": timings[0],
+            "median": statistics.median(timings),
+            "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        }
+        self.results[name] = result
+        print(f"  {name:<44} {_ms(result['min']):>10} {_ms(result['median']):>10} {_ms(result['p95']):>10}"
+              f"  x{result['rounds']}")
+        return result
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.3f}ms"
+
+
+def _text(rng, low=5, high=40):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+# === Suites ===
+
+def suite_questions(runner):
+    # End-to-end: scheduler -> APIClient -> resilience -> backend, and the paths that skip the model
+    from api_handler import APIClient
+    from fake_backend import FakeModel
+    from question_logic import QuestionRouter
+    from response_cache import ResponseCache
+
+    scratch = tempfile.mkdtemp()
+    model = FakeModel(first_delay=0.01, chunk_delay=0.001, latency="lognormal", jitter=0.3, seed=1)
+    api = APIClient(None, model=model, cache=ResponseCache(os.path.join(scratch, "cache.db")))
+    counter = iter(range(10 ** 9))
+    try:
+        runner.bench("question: blocking, cache miss",
+                     lambda: api.submit(api.get_response, f"What is energy? #{next(counter)}", "Science")
+                     .future.result())
+
+        def first_chunk():
+            chunks = api.stream_response(f"Explain slope #{next(counter)}", "Math")
+            next(chunks)
+            chunks.close()
+        runner.bench("question: streamed, first chunk", first_chunk)
+
+        api.get_response("What is a metaphor?", "English")
+        runner.bench("question: exact cache hit", lambda: api.get_response("what is a metaphor", "English"),
+                     rounds=500)
+
+        router = QuestionRouter()
+        runner.bench("question: routed locally", lambda: router.route("what is 12 * 7 + 3"), rounds=2000)
+    finally:
+        api.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def suite_render(runner):
+    try:
+        import tkinter as tk
+    except ImportError:
+        raise Skip("tkinter is not installed")
+    from api_handler import APIClient
+    from fake_backend import FakeModel
+    from gui import TutorBotGUI
+    from user_profile import UserProfile
+
+    cwd = os.getcwd()
+    scratch = tempfile.mkdtemp()
+    os.chdir(scratch)  # so no last_session file is picked up or written
+    try:
+        try:
+            app = TutorBotGUI(api_client=APIClient(None, model=FakeModel()), user=UserProfile("bench"))
+        except tk.TclError as e:
+            raise Skip(f"no display ({e}); run under xvfb-run")
+        app.root.withdraw()
+        app.notification_sound.set(False)
+        rng = random.Random(0)
+        app.conversation.replace(
+            {"sender": "You" if i % 2 else "Bot", "text": _text(rng), "time": "12:00:00"} for i in range(50_000))
+
+        def refresh():
+            app._refresh_chat()
+            app.root.update()
+        runner.bench("render: 50k messages, full refresh", refresh, rounds=10)
+
+        def append():
+            app._append_message("You", "Appended message")
+            app.root.update_idletasks()
+        runner.bench("render: append one message", append, rounds=200)
+        app.root.destroy()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def suite_search(runner):
+    from search_index import SearchIndex
+
+    rng = random.Random(0)
+    messages = [_text(rng) for _ in range(50_000)]
+
+    def build():
+        index = SearchIndex()
+        for i, text in enumerate(messages):
+            index.add(i, text)
+        return index
+    runner.bench("search: index 50k messages", build, rounds=3)
+
+    index = build()
+    runner.bench("search: word", lambda: index.search("energy"), rounds=200)
+    runner.bench("search: prefix", lambda: index.search("photo"), rounds=200)
+    runner.bench("search: phrase", lambda: index.search('"light energy"'), rounds=100)
+
+
+def suite_session(runner):
+    from session_store import SessionJournal
+    from transcript_io import read_messages, write_messages
+
+    rng = random.Random(0)
+    messages = [{"sender": "You" if i % 2 else "Bot", "text": _text(rng), "time": "12:00:00"}
+                for i in range(20_000)]
+    scratch = tempfile.mkdtemp()
+    try:
+        for ext in (".jsonl", ".json", ".txt", ".tbin"):
+            path = os.path.join(scratch, "session" + ext)
+            runner.bench(f"session: save 20k ({ext})", lambda: write_messages(path, messages), rounds=5)
+            runner.bench(f"session: load 20k ({ext})", lambda: sum(1 for _ in read_messages(path)), rounds=5)
+
+        journal_path = os.path.join(scratch, "journal.jsonl")
+
+        def journal_session():
+            journal = SessionJournal(journal_path, compact_every=10 ** 9)
+            for msg in messages[:5000]:
+                journal.append(msg)
+            journal.close()
+        runner.bench("session: journal 5k appends + close", journal_session, rounds=5)
+        journal = SessionJournal(journal_path)
+        runner.bench("session: restore last 1000", lambda: journal.tail(1000), rounds=50)
+        journal.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def suite_startup(runner):
+    import subprocess
+    from bench_startup import import_report
+
+    # Cumulative import time of the app's modules, from `python -X importtime` in a fresh process
+    samples = []
+
+    def imports():
+        with contextlib.redirect_stdout(io.StringIO()):
+            samples.append(import_report() / 1000)
+    runner.bench("startup: app imports, process wall time", imports, rounds=5)
+    runner.record("startup: app imports, importtime", samples[runner.warmup:])
+    runner.bench("startup: bare interpreter", lambda: subprocess.run([sys.executable, "-c", "pass"], check=True),
+                 rounds=5)
+
+
+SUITES = {
+    "questions": suite_questions,
+    "render": suite_render,
+    "search": suite_search,
+    "session": suite_session,
+    "startup": suite_startup,
+}
+
+
+# === Comparison ===
+
+def compare(results, baseline, threshold):
+    # Returns the names of cases whose median regressed by more than threshold
+    regressions = []
+    print(f"\n{'case':<46} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None or not before["median"]:
+            continue
+        change = result["median"] / before["median"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<46} {_ms(before['median']):>10} {_ms(result['median']):>10} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("-k", dest="only", action="append", default=[],
+                        help="run suites whose name contains this (repeatable)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file from an earlier run to compare medians against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"slowdown flagged as a regression (default {DEFAULT_THRESHOLD:.0%})")
+    parser.add_argument("--quick", action="store_true", help="a quarter of the rounds, for a smoke run")
+    args = parser.parse_args(argv)
+
+    from metrics import metrics
+    metrics.enabled = False  # the suite measures the code, not the app's own instrumentation
+
+    runner = Runner(rounds_scale=0.25 if args.quick else 1.0)
+    skipped = {}
+    print(f"  {'case':<44} {'min':>10} {'median':>10} {'p95':>10}")
+    for name, suite in SUITES.items():
+        if args.only and not any(k in name for k in args.only):
+            continue
+        try:
+            suite(runner)
+        except Skip as e:
+            skipped[name] = str(e)
+            print(f"  {name}: skipped, {e}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": runner.results, "skipped": skipped}, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(runner.results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
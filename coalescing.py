@@ -0,0 +1,225 @@
+# coalescing.py
+# Share one upstream model call between identical concurrent requests, and
+# optionally group distinct prompts into batches
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.finished = False
+        self.result = None
+        self.error = None
+        self.waiters = 0  # followers not done with the call yet
+
+
+class SingleFlight:
+    """Concurrent callers with the same key wait for the first caller's result.
+
+    `upstream` counts calls that really ran; `shared` counts callers that
+    got a result without one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.upstream = 0
+        self.shared = 0
+
+    def _join(self, key):
+        # Returns (call, is_leader)
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                call.waiters += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.upstream += 1
+            return call, True
+
+    def _leave(self, key, call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def _release(self, call):
+        with self._lock:
+            call.waiters -= 1
+
+    def do(self, key, fn):
+        call, leader = self._join(key)
+        if not leader:
+            try:
+                call.done.wait()
+            finally:
+                self._release(call)
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._leave(key, call)
+            # Stream followers of a blocking leader get the answer as one chunk
+            with call.cond:
+                if call.result is not None:
+                    call.chunks.append(call.result)
+                call.finished = True
+                call.cond.notify_all()
+            call.done.set()
+
+    def stream(self, key, make_iter):
+        """Like do(), for iterators: followers replay every chunk the leader has seen so far, then follow live."""
+        call, leader = self._join(key)
+        if leader:
+            return self._lead_stream(key, call, make_iter)
+        return self._follow_stream(call)
+
+    def _lead_stream(self, key, call, make_iter):
+        handed_off = False
+        try:
+            chunks = iter(make_iter())
+            for chunk in chunks:
+                self._publish(call, chunk)
+                yield chunk
+        except Exception as e:
+            call.error = e
+            raise
+        except GeneratorExit:
+            # The leader's consumer stopped (e.g. cancelled). Followers still waiting get
+            # the rest of the answer from a background thread; with none, upstream stops.
+            handed_off = self._keep_for_followers(key, call)
+            if handed_off:
+                threading.Thread(target=self._drain, args=(key, call, chunks),
+                                 name="single-flight-drain", daemon=True).start()
+            else:
+                call.error = RuntimeError("shared request was cancelled")
+                _close(chunks)
+            raise
+        finally:
+            if not handed_off:
+                self._finish(key, call)
+
+    def _keep_for_followers(self, key, call):
+        # True if someone still waits on the call; otherwise no one else can join it
+        with self._lock:
+            if call.waiters:
+                return True
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            return False
+
+    def _drain(self, key, call, chunks):
+        # Runs the rest of an abandoned leader's upstream call for its followers
+        try:
+            for chunk in chunks:
+                self._publish(call, chunk)
+                if not self._keep_for_followers(key, call):
+                    call.error = RuntimeError("shared request was cancelled")
+                    _close(chunks)
+                    break
+        except Exception as e:
+            call.error = e
+        finally:
+            self._finish(key, call)
+
+    def _publish(self, call, chunk):
+        with call.cond:
+            call.chunks.append(chunk)
+            call.cond.notify_all()
+
+    def _finish(self, key, call):
+        self._leave(key, call)
+        with call.cond:
+            call.finished = True
+            call.result = "".join(call.chunks)
+            call.cond.notify_all()
+        call.done.set()  # for blocking followers
+
+    def _follow_stream(self, call):
+        i = 0
+        try:
+            while True:
+                with call.cond:
+                    while i >= len(call.chunks) and not call.finished:
+                        call.cond.wait()
+                    if i < len(call.chunks):
+                        chunk = call.chunks[i]
+                        i += 1
+                    elif call.error is not None:
+                        raise call.error
+                    else:
+                        return
+                yield chunk
+        finally:
+            self._release(call)
+
+
+def _close(iterator):
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+class MicroBatcher:
+    """Collects prompts for up to `window` seconds (or `max_batch` prompts) and
+    sends them upstream as one run_batch(prompts) call returning one answer each.
+
+    The first caller of a batch waits out the window and runs it; the others
+    block until their answer is ready.
+    """
+
+    def __init__(self, run_batch, window=0.02, max_batch=16):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._batch = None
+        self.batches = 0
+        self.prompts = 0
+
+    def submit(self, prompt):
+        with self._cond:
+            leader = self._batch is None
+            if leader:
+                self._batch = []
+            batch = self._batch
+            slot = _Call()
+            batch.append((prompt, slot))
+            self.prompts += 1
+            if len(batch) >= self.max_batch:
+                self._batch = None
+                self._cond.notify_all()
+            elif leader:
+                self._cond.wait_for(lambda: self._batch is not batch, timeout=self.window)
+                if self._batch is batch:
+                    self._batch = None
+        if leader:
+            self._run(batch)
+        slot.done.wait()
+        if slot.error is not None:
+            raise slot.error
+        return slot.result
+
+    def _run(self, batch):
+        with self._cond:
+            self.batches += 1
+        try:
+            results = self.run_batch([prompt for prompt, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch of {len(batch)} prompts returned {len(results)} answers")
+            for (_, slot), result in zip(batch, results):
+                slot.result = result
+        except Exception as e:
+            for _, slot in batch:
+                slot.error = e
+        for _, slot in batch:
+            slot.done.set()
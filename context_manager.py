@@ -0,0 +1,116 @@
+# context_manager.py
+# Bounded multi-turn context: recent turns verbatim, older turns in a rolling summary
+
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# One background thread folds old turns into summaries for every context
+_summary_pool = None
+_summary_pool_lock = threading.Lock()
+
+
+def _pool():
+    global _summary_pool
+    with _summary_pool_lock:
+        if _summary_pool is None:
+            _summary_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary")
+        return _summary_pool
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def _first_sentence(text, max_words):
+    words = SENTENCE_RE.split(text.strip(), maxsplit=1)[0].split()
+    return " ".join(words[:max_words]) + (" ..." if len(words) > max_words else "")
+
+
+def extractive_summary(summary, turns, budget):
+    """Default summarizer: first sentence of each question and answer, oldest lines dropped past the budget."""
+    lines = [line for line in summary.split("\n") if line]
+    for question, answer in turns:
+        lines.append(f"Student asked: {_first_sentence(question, 20)} Tutor: {_first_sentence(answer, 25)}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationContext:
+    """Context sent with each question, of roughly constant size.
+
+    The newest turns are kept verbatim up to `token_budget`. Turns pushed out
+    of that window are folded into a summary of at most `summary_budget`
+    tokens on a background thread, never on the request path.
+    `summarizer(summary, turns, budget)` can replace the extractive default,
+    e.g. with a model call.
+    """
+
+    def __init__(self, token_budget=1500, summary_budget=300, summarizer=None):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer or extractive_summary
+        self.summary = ""
+        self._turns = deque()  # (question, answer, tokens)
+        self._window_tokens = 0
+        self._evicted = []  # turns waiting to be folded into the summary
+        self._folding = False
+        self._lock = threading.Lock()
+
+    def add_turn(self, question, answer):
+        tokens = estimate_tokens(question) + estimate_tokens(answer)
+        with self._lock:
+            self._turns.append((question, answer, tokens))
+            self._window_tokens += tokens
+            while len(self._turns) > 1 and self._window_tokens > self.token_budget:
+                old_question, old_answer, old_tokens = self._turns.popleft()
+                self._window_tokens -= old_tokens
+                self._evicted.append((old_question, old_answer))
+            if self._evicted and not self._folding:
+                self._folding = True
+                _pool().submit(self._fold)
+
+    def _fold(self):
+        while True:
+            with self._lock:
+                turns, self._evicted = self._evicted, []
+                if not turns:
+                    self._folding = False
+                    return
+                summary = self.summary
+            try:
+                summary = self.summarizer(summary, turns, self.summary_budget)
+            except Exception:
+                summary = extractive_summary(summary, turns, self.summary_budget)
+            with self._lock:
+                self.summary = summary
+
+    def empty(self):
+        # True until the first turn is added
+        with self._lock:
+            return not self._turns and not self.summary
+
+    def render(self):
+        # Text block describing the conversation so far ("" when there is none)
+        with self._lock:
+            summary = self.summary
+            turns = list(self._turns)
+        parts = []
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        if turns:
+            recent = "\n".join(f"Student: {q}\nTutor: {a}" for q, a, _ in turns)
+            parts.append(f"Recent conversation:\n{recent}")
+        return "\n\n".join(parts)
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
+            self._window_tokens = 0
+            self._evicted = []
+            self.summary = ""
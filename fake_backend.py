@@ -0,0 +1,118 @@
+# fake_backend.py
+# Local stand-in for the Gemini model, for offline runs and benchmarks
+
+import math
+import random
+import time
+
+LATENCIES = ("fixed", "uniform", "lognormal", "exponential")
+
+
+class ServiceUnavailable(Exception):
+    # Same name and code as the SDK's 503 error, so it is treated as transient
+    code = 503
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Mimics GenerativeModel.generate_content without any network access.
+
+    The reply is split into `chunk_size`-character chunks. `first_delay` is the
+    wait before the first chunk and `chunk_delay` the wait between chunks.
+    With `latency` other than "fixed", first_delay is the median of a
+    distribution: uniform within +-`jitter` of it, lognormal with sigma
+    `jitter`, or exponential. Every random draw comes from `seed`, so a
+    single-threaded run is repeatable.
+
+    Faults can be injected: a fraction `error_rate` of calls raise
+    ServiceUnavailable, a fraction `hang_rate` never answer (until the
+    request_options timeout, if one is given), and outage(seconds) fails every
+    call for a while.
+    """
+
+    def __init__(self, reply=None, chunk_size=8, first_delay=0.2, chunk_delay=0.02,
+                 error_rate=0.0, hang_rate=0.0, latency="fixed", jitter=0.5, seed=0):
+        if latency not in LATENCIES:
+            raise ValueError(f"latency must be one of {LATENCIES}")
+        # The default echoes only the question (last line), so answers don't grow with the context
+        self.reply = reply or (lambda prompt: f"Here is some help with: {prompt.rsplit(chr(10), 1)[-1]}")
+        self.chunk_size = chunk_size
+        self.first_delay = first_delay
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.batch_calls = 0
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._outage_until = 0.0
+
+    def outage(self, seconds):
+        self._outage_until = time.monotonic() + seconds
+
+    def _fault(self, timeout):
+        # Raises the injected fault for this call, if any
+        roll = self._random.random()
+        if time.monotonic() < self._outage_until or roll < self.error_rate:
+            self.errors += 1
+            raise ServiceUnavailable("503 The model is overloaded. Please try again later.")
+        if roll < self.error_rate + self.hang_rate:
+            self.errors += 1
+            time.sleep(timeout if timeout is not None else 3600)
+            raise TimeoutError("504 Deadline Exceeded")
+
+    def _first_delay(self):
+        if self.latency == "uniform":
+            return self._random.uniform(self.first_delay * (1 - self.jitter), self.first_delay * (1 + self.jitter))
+        if self.latency == "lognormal":
+            return self.first_delay * math.exp(self._random.gauss(0, self.jitter))
+        if self.latency == "exponential":
+            # Median first_delay: mean = median / ln 2
+            return self._random.expovariate(math.log(2) / self.first_delay) if self.first_delay else 0.0
+        return self.first_delay
+
+    def _wait(self, delay, timeout):
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("504 Deadline Exceeded")
+        time.sleep(delay)
+
+    def _chunks(self, prompt):
+        if isinstance(prompt, list):
+            # Multimodal contents: text parts plus inline {"mime_type", "data"} parts
+            prompt = " ".join(p if isinstance(p, str) else f"[{p['mime_type']}, {len(p['data'])} bytes]" for p in prompt)
+        text = self.reply(prompt)
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+    def _stream(self, chunks, timeout):
+        self._fault(timeout)
+        self._wait(self._first_delay(), timeout)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(self.chunk_delay)
+            yield FakeChunk(chunk)
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.calls += 1
+        timeout = (request_options or {}).get("timeout")
+        chunks = self._chunks(prompt)
+        if stream:
+            return self._stream(chunks, timeout)
+        # A blocking call waits for the whole answer
+        self._fault(timeout)
+        self._wait(self._first_delay() + self.chunk_delay * max(0, len(chunks) - 1), timeout)
+        return FakeChunk("".join(chunks))
+
+    def generate_batch(self, prompts):
+        # Several prompts for the price of one round trip, as a batching backend would offer
+        self.calls += 1
+        self.batch_calls += 1
+        self._fault(None)
+        time.sleep(self._first_delay())
+        return ["".join(self._chunks(prompt)) for prompt in prompts]
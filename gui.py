@@ -1,8 +1,19 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, simpledialog
+from tkinter import ttk, filedialog, messagebox
+import bisect
 import datetime
+import itertools
 import json
 import threading
+from scheduler import INTERACTIVE, QueueFullError, current_request
+from search_index import SearchIndex, match_spans
+from session_store import SessionJournal
+from question_logic import QuestionRouter
+from image_pipeline import ImagePipeline
+import transcript_io
+from metrics import metrics
+from resilience import BackendUnavailable
+from prefetch import Prefetcher, FOLLOW_UPS
 import time
 import os
 import platform
@@ -23,21 +34,78 @@ class TutorBotGUI:
         # Add more themes if you want
     }
 
+    SUBJECTS = ["Math", "Science", "English", "History", "General"]
+
     QUICK_REPLIES = ["Hello!", "Thanks!", "Can you help with math?", "Science question", "Explain history"]
 
-    def __init__(self, api_client, user):
+    # Windowed chat view: messages kept in the text widget and paged in/out at a time
+    VIEW_WINDOW = 300
+    VIEW_PAGE = 100
+
+    # Session journal, and how many of its newest messages are shown at startup
+    SESSION_PATH = "last_session.jsonl"
+    SESSION_TAIL = 1000
+
+    # Sessions per page in the history browser, messages per page in a past session
+    HISTORY_PAGE = 20
+    HISTORY_MESSAGES_PAGE = 200
+
+    # Minimum interval between chat updates while a reply is streaming in
+    STREAM_FLUSH_MS = 50
+
+    # Transcript formats (see transcript_io) and messages parsed per main-loop tick on import
+    TRANSCRIPT_TYPES = [("Text files", "*.txt"), ("JSON files", "*.json"), ("JSON Lines", "*.jsonl"),
+                        ("Binary transcript", "*.tbin")]
+    IMPORT_BATCH = 5000
+
+    # Refresh interval of the performance dashboard while it is shown
+    DASHBOARD_MS = 1000
+
+    # Quiet time after an answer or a subject change before likely next questions are prefetched
+    PREFETCH_IDLE_MS = 1500
+
+    def __init__(self, api_client, user, metrics_path=None):
         self.api_client = api_client
         self.user = user
+        # Timings are written here on close (.prom or .jsonl, see metrics.Metrics.export)
+        self.metrics_path = metrics_path
+        self.router = QuestionRouter()
+        # Answers to quick replies and likely follow-ups, generated while the student reads
+        self.prefetcher = Prefetcher(api_client)
+        self._prefetch_job = None
         self.root = tk.Tk()
         self.root.title("Tutor Bot - Homework Helper")
         self.root.geometry("700x600")
         self.root.minsize(600, 500)
 
-        # Conversation history for export/search
-        self.conversation = []
-
-        # Current attached image bytes
+        # Conversation history for export/search: the profile's compact message store,
+        # which its question/answer history points into
+        self.conversation = user.messages
+
+        # "Typing..." indicators of outstanding requests (request id -> entry),
+        # shown in the live area after the last message
+        self._pending = {}
+        # Cancellation and error notes, shown in the live area until the next question;
+        # they are not chat turns, so never stored, journaled, indexed or exported
+        self._notices = []
+
+        # Slice of self.conversation currently rendered in the chat widget
+        self._view_start = 0
+        self._view_end = 0
+        self._view_lines = []  # line count of each rendered message
+        self._paging_scheduled = False
+
+        # Streaming reply state: (request id, chunk) pairs arrive on API threads
+        # and are drained on the UI thread into per-request text
+        self._stream_lock = threading.Lock()
+        self._stream_chunks = []
+        self._stream_text = {}
+        self._flush_scheduled = False
+
+        # Current attached image bytes, already downscaled and re-encoded by the pipeline
         self.attached_image = None
+        self.image_pipeline = ImagePipeline()
+        self._image_loading = 0
 
         # Settings variables
         self.subject_var = tk.StringVar(value="Math")
@@ -46,11 +114,23 @@ class TutorBotGUI:
         self.show_timestamps = tk.BooleanVar(value=True)
         self.notification_sound = tk.BooleanVar(value=True)
         self.ai_delay = tk.DoubleVar(value=0.5)
+        self.virtual_view = tk.BooleanVar(value=True)
+        self.stream_responses = tk.BooleanVar(value=True)
+        self.show_dashboard = tk.BooleanVar(value=False)
+        # Off by default: speculative answers are paid model calls the student may never ask for
+        self.prefetch_enabled = tk.BooleanVar(value=False)
 
         # Search variables
         self.search_var = tk.StringVar()
         self.search_results = []
         self.search_index = 0
+        self._search_term = None
+        self._search_version = None
+        self._search_current = None  # conversation index of the current match
+
+        # Inverted index over self.conversation[:self._indexed_upto]
+        self.message_index = SearchIndex()
+        self._indexed_upto = 0
 
         self._setup_widgets()
         self._apply_theme()
@@ -61,6 +141,9 @@ class TutorBotGUI:
         # Load last session conversation if exists
         self._load_last_session()
 
+        # Keep the request queue status current
+        self._poll_queue_status()
+
         # Drag and drop image attach (Windows only)
         if platform.system() == 'Windows':
             self._enable_drag_drop()
@@ -72,9 +155,9 @@ class TutorBotGUI:
 
         # Subject dropdown
         tk.Label(top_frame, text="Subject:").pack(side="left")
-        subjects = ["Math", "Science", "English", "History", "General"]
-        self.subject_dropdown = ttk.Combobox(top_frame, textvariable=self.subject_var, values=subjects, state="readonly", width=10)
+        self.subject_dropdown = ttk.Combobox(top_frame, textvariable=self.subject_var, values=self.SUBJECTS, state="readonly", width=10)
         self.subject_dropdown.pack(side="left", padx=5)
+        self.subject_dropdown.bind("<<ComboboxSelected>>", self._schedule_prefetch)
 
         # Theme dropdown
         tk.Label(top_frame, text="Theme:").pack(side="left", padx=(10, 0))
@@ -103,6 +186,10 @@ class TutorBotGUI:
         self.load_btn = tk.Button(top_frame, text="Load Conversation", command=self._load_conversation)
         self.load_btn.pack(side="right", padx=5)
 
+        # Browse archived sessions
+        self.history_btn = tk.Button(top_frame, text="History", command=self._show_history)
+        self.history_btn.pack(side="right", padx=5)
+
         # AI response delay slider
         delay_frame = tk.Frame(self.root)
         delay_frame.pack(fill="x", padx=10, pady=(0,5))
@@ -110,16 +197,36 @@ class TutorBotGUI:
         self.delay_slider = tk.Scale(delay_frame, variable=self.ai_delay, from_=0, to=3, resolution=0.1, orient="horizontal", length=150)
         self.delay_slider.pack(side="left", padx=5)
 
+        # Windowed view toggle: keep only part of long conversations in the widget
+        self.virtual_cb = tk.Checkbutton(delay_frame, text="Windowed View", variable=self.virtual_view, command=self._refresh_chat)
+        self.virtual_cb.pack(side="left", padx=10)
+
+        # Show replies as they are generated instead of all at once
+        self.stream_cb = tk.Checkbutton(delay_frame, text="Stream Replies", variable=self.stream_responses)
+        self.stream_cb.pack(side="left", padx=10)
+
+        # Answer likely next questions in the background while idle
+        self.prefetch_cb = tk.Checkbutton(delay_frame, text="Prefetch", variable=self.prefetch_enabled, command=self._toggle_prefetch)
+        self.prefetch_cb.pack(side="left", padx=10)
+
+        # Latency percentiles and slowest operations, packed above the chat when enabled
+        self.dashboard_cb = tk.Checkbutton(delay_frame, text="Perf Dashboard", variable=self.show_dashboard, command=self._toggle_dashboard)
+        self.dashboard_cb.pack(side="left", padx=10)
+        self.dashboard_frame = tk.Frame(self.root)
+        self.dashboard_text = tk.Text(self.dashboard_frame, height=14, font=("Courier", 9), state="disabled", wrap="none")
+        self.dashboard_text.pack(side="left", fill="x", expand=True)
+        tk.Button(self.dashboard_frame, text="Export...", command=self._export_metrics).pack(side="right", anchor="n", padx=5)
+
         # Middle frame: chat display + scrollbar
-        chat_frame = tk.Frame(self.root)
+        chat_frame = self.chat_frame = tk.Frame(self.root)
         chat_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
         self.chat_text = tk.Text(chat_frame, state="disabled", wrap="word", font=("Arial", self.font_size_var.get()), bg="#1e2228", fg="white", padx=5, pady=5)
         self.chat_text.pack(side="left", fill="both", expand=True)
 
-        self.scrollbar = ttk.Scrollbar(chat_frame, command=self.chat_text.yview)
+        self.scrollbar = ttk.Scrollbar(chat_frame, command=self._on_scrollbar)
         self.scrollbar.pack(side="right", fill="y")
-        self.chat_text['yscrollcommand'] = self.scrollbar.set
+        self.chat_text['yscrollcommand'] = self._on_chat_scroll
 
         # Bottom frame: input + buttons + quick replies + image upload + emoji picker
         bottom_frame = tk.Frame(self.root)
@@ -142,6 +249,15 @@ class TutorBotGUI:
         self.emoji_btn = tk.Button(bottom_frame, text="😀", command=self._show_emoji_picker)
         self.emoji_btn.pack(side="left")
 
+        # Cancel the latest outstanding question (also bound to Escape)
+        self.cancel_btn = tk.Button(bottom_frame, text="Cancel", command=self._cancel_request, state="disabled")
+        self.cancel_btn.pack(side="left", padx=5)
+        self.root.bind("<Escape>", self._cancel_request)
+
+        # Requests waiting for / being served by the API
+        self.queue_label = tk.Label(bottom_frame, text="")
+        self.queue_label.pack(side="left", padx=5)
+
         # Quick replies frame
         quick_reply_frame = tk.Frame(self.root)
         quick_reply_frame.pack(fill="x", padx=10, pady=(0,10))
@@ -165,6 +281,10 @@ class TutorBotGUI:
         self.search_next_btn = tk.Button(search_frame, text="Next", command=lambda: self._search_chat(prev=False))
         self.search_next_btn.pack(side="left", padx=2)
 
+        self.chat_text.tag_config("search", background="yellow", foreground="black")
+        self.chat_text.tag_config("search_current", background="orange", foreground="black")
+        self.chat_text.tag_raise("search_current")
+
     # === Theme and UI updates ===
 
     def _apply_theme(self, event=None):
@@ -182,22 +302,168 @@ class TutorBotGUI:
         self.upload_btn.config(bg=bg, fg=fg)
         self.send_btn.config(bg=bg, fg=fg)
         self.emoji_btn.config(bg=bg, fg=fg)
+        self.cancel_btn.config(bg=bg, fg=fg)
 
         # Dropdowns & checkbuttons need ttk style update (if you want, can customize further)
 
         # Refresh chat to apply font size and timestamps
         self._refresh_chat()
 
-    def _refresh_chat(self):
+    def _format_message(self, item):
+        timestamp = f"[{item['time']}]" if self.show_timestamps.get() else ""
+        prefix = f"{timestamp} {item['sender']}: " if timestamp else f"{item['sender']}: "
+        return prefix + item['text'] + "\n"
+
+    def _message_lines(self, item):
+        return item['text'].count("\n") + 1
+
+    def _render_live(self):
+        # The live area after the "live" mark holds notices and typing indicators.
+        # Messages are inserted at the mark (right gravity); the live area is rebuilt behind it.
+        self.chat_text.mark_gravity("live", "left")
+        self.chat_text.delete("live", "end-1c")
+        if self._notices or self._pending:
+            items = self._notices + list(self._pending.values())
+            self.chat_text.insert(tk.END, "".join(self._format_message(item) for item in items))
+        self.chat_text.mark_gravity("live", "right")
+
+    def _render_window(self, start, end):
+        # Full redraw of conversation[start:end]
+        items = self.conversation[start:end]
         self.chat_text.config(state="normal")
         self.chat_text.delete(1.0, tk.END)
-        for item in self.conversation:
-            timestamp = f"[{item['time']}]" if self.show_timestamps.get() else ""
-            prefix = f"{timestamp} {item['sender']}: " if timestamp else f"{item['sender']}: "
-            self.chat_text.insert(tk.END, prefix + item['text'] + "\n")
+        self.chat_text.insert(tk.END, "".join(self._format_message(item) for item in items))
+        self.chat_text.mark_set("live", "end-1c")
+        self._render_live()
+        self.chat_text.config(state="disabled")
+        self._view_start, self._view_end = start, end
+        self._view_lines = [self._message_lines(item) for item in items]
+        self._highlight_matches()
+
+    @metrics.timed("ui.render_full")
+    def _refresh_chat(self):
+        # Full redraw, only needed when theme, font size, timestamps or the whole conversation change
+        n = len(self.conversation)
+        start = max(0, n - self.VIEW_WINDOW) if self.virtual_view.get() else 0
+        self._render_window(start, n)
+        self.chat_text.see(tk.END)
+
+    def _trim_window(self, keep_end):
+        # Drop messages from the far side of the window; returns the lines removed from the top
+        count = self._view_end - self._view_start
+        if not self.virtual_view.get() or count <= self.VIEW_WINDOW + self.VIEW_PAGE:
+            return 0
+        k = count - self.VIEW_WINDOW
+        if keep_end:
+            lines = sum(self._view_lines[:k])
+            self.chat_text.delete("1.0", f"{lines + 1}.0")
+            del self._view_lines[:k]
+            self._view_start += k
+            return lines
+        lines = sum(self._view_lines[:count - k])
+        self.chat_text.delete(f"{lines + 1}.0", "live")
+        del self._view_lines[count - k:]
+        self._view_end -= k
+        return 0
+
+    @metrics.timed("ui.render_append")
+    def _append_to_chat(self, item):
+        # Incremental update: only the new message is inserted
+        n = len(self.conversation)
+        if self._view_end != n - 1:
+            # Reading older history; the message is paged in when scrolled to
+            self._update_scrollbar()
+            return
+        self.chat_text.config(state="normal")
+        self.chat_text.insert("live", self._format_message(item))
+        self._view_end = n
+        self._view_lines.append(self._message_lines(item))
+        self._trim_window(keep_end=True)
         self.chat_text.see(tk.END)
         self.chat_text.config(state="disabled")
 
+    def _scroll_to_bottom(self):
+        if self._view_end != len(self.conversation):
+            self._refresh_chat()
+        self.chat_text.see(tk.END)
+
+    def _message_line(self, index):
+        # Line number of conversation[index], rendering a window around it if needed
+        if not self._view_start <= index < self._view_end:
+            n = len(self.conversation)
+            start = max(0, min(index - self.VIEW_WINDOW // 2, n - self.VIEW_WINDOW))
+            self._render_window(start, min(n, start + self.VIEW_WINDOW))
+        return 1 + sum(self._view_lines[:index - self._view_start])
+
+    # === Windowed view scrolling ===
+
+    def _on_chat_scroll(self, first, last):
+        # yscrollcommand of the chat widget: page neighbouring messages in at the window edges
+        first, last = float(first), float(last)
+        if self.virtual_view.get() and not self._paging_scheduled:
+            if first <= 0.0 and self._view_start > 0:
+                self._paging_scheduled = True
+                self.root.after_idle(self._page_older)
+            elif last >= 1.0 and self._view_end < len(self.conversation):
+                self._paging_scheduled = True
+                self.root.after_idle(self._page_newer)
+        self._update_scrollbar(first, last)
+
+    def _update_scrollbar(self, first=None, last=None):
+        # Map the widget's position to a position in the whole conversation
+        if first is None:
+            first, last = self.chat_text.yview()
+        n = len(self.conversation)
+        shown = self._view_end - self._view_start
+        if self.virtual_view.get() and 0 < shown < n:
+            first = (self._view_start + first * shown) / n
+            last = (self._view_start + last * shown) / n
+        self.scrollbar.set(first, last)
+
+    def _on_scrollbar(self, *args):
+        n = len(self.conversation)
+        if args[0] == "moveto" and self.virtual_view.get() and self._view_end - self._view_start < n:
+            # Dragging addresses the whole conversation, not just the rendered window
+            target = min(n - 1, max(0, int(float(args[1]) * n)))
+            self.chat_text.yview(f"{self._message_line(target)}.0")
+        else:
+            self.chat_text.yview(*args)
+
+    def _page_older(self):
+        self._paging_scheduled = False
+        if self._view_start == 0 or self.chat_text.yview()[0] > 0.0:
+            return
+        k = min(self.VIEW_PAGE, self._view_start)
+        items = self.conversation[self._view_start - k:self._view_start]
+        lines = [self._message_lines(item) for item in items]
+        top = int(self.chat_text.index("@0,0").split(".")[0])
+        self.chat_text.config(state="normal")
+        self.chat_text.insert("1.0", "".join(self._format_message(item) for item in items))
+        self._view_lines[:0] = lines
+        self._view_start -= k
+        self._trim_window(keep_end=False)
+        self.chat_text.config(state="disabled")
+        self._highlight_matches()
+        # Keep the same message at the top of the viewport
+        self.chat_text.yview(f"{top + sum(lines)}.0")
+
+    def _page_newer(self):
+        self._paging_scheduled = False
+        n = len(self.conversation)
+        if self._view_end >= n or self.chat_text.yview()[1] < 1.0:
+            return
+        k = min(self.VIEW_PAGE, n - self._view_end)
+        items = self.conversation[self._view_end:self._view_end + k]
+        top = int(self.chat_text.index("@0,0").split(".")[0])
+        self.chat_text.config(state="normal")
+        self.chat_text.insert("live", "".join(self._format_message(item) for item in items))
+        self._view_lines.extend(self._message_lines(item) for item in items)
+        self._view_end += k
+        removed = self._trim_window(keep_end=True)
+        self.chat_text.config(state="disabled")
+        self._highlight_matches()
+        self.chat_text.yview(f"{max(1, top - removed)}.0")
+
     def _auto_dark_mode(self):
         hour = datetime.datetime.now().hour
         if 18 <= hour or hour < 6:
@@ -211,11 +477,22 @@ class TutorBotGUI:
     # === Conversation handling ===
 
     def _append_message(self, sender, text):
-        now = datetime.datetime.now().strftime("%H:%M:%S")
-        self.conversation.append({"sender": sender, "text": text, "time": now})
-        self._refresh_chat()
+        item = self.conversation[self.conversation.append(sender, text)]
+        self.journal.append(item.to_dict())
+        if self._indexed_upto == len(self.conversation) - 1:
+            self._index_messages()
+        self._append_to_chat(item)
         if sender == "Bot" and self.notification_sound.get():
             self._play_notification_sound()
+        return item
+
+    def _set_conversation(self, messages):
+        # Replace the whole conversation; the search index catches up in the background
+        self.conversation.replace(messages)
+        self.message_index.clear()
+        self._indexed_upto = 0
+        self._refresh_chat()
+        self._index_in_background()
 
     def _play_notification_sound(self):
         if winsound:
@@ -225,160 +502,503 @@ class TutorBotGUI:
             print('\a')
 
     def _save_conversation(self):
-        filetypes = [("Text files", "*.txt"), ("JSON files", "*.json")]
-        filename = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=filetypes)
+        filename = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=self.TRANSCRIPT_TYPES)
         if not filename:
             return
-        try:
-            if filename.endswith(".json"):
-                with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(self.conversation, f, indent=2)
-            else:
-                with open(filename, "w", encoding="utf-8") as f:
-                    for msg in self.conversation:
-                        ts = f"[{msg['time']}]" if self.show_timestamps.get() else ""
-                        f.write(f"{ts} {msg['sender']}: {msg['text']}\n")
-            messagebox.showinfo("Success", f"Conversation saved to {filename}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save: {e}")
+        # Write the messages present now from a worker thread; new ones keep arriving meanwhile
+        conversation = self.conversation
+        count, generation = len(conversation), conversation.generation
+        timestamps = self.show_timestamps.get()
+
+        def messages():
+            for msg in conversation.iter_messages(0, count):
+                if conversation.generation != generation:
+                    raise RuntimeError("another conversation was loaded while saving")
+                yield msg.to_dict()
+
+        def work():
+            try:
+                transcript_io.write_messages(filename, messages(), timestamps=timestamps)
+                self.root.after(0, messagebox.showinfo, "Success", f"Conversation saved to {filename}")
+            except Exception as e:
+                self.root.after(0, messagebox.showerror, "Error", f"Failed to save: {e}")
+
+        threading.Thread(target=work, daemon=True).start()
 
     def _load_conversation(self):
-        filetypes = [("Text files", "*.txt"), ("JSON files", "*.json")]
-        filename = filedialog.askopenfilename(filetypes=filetypes)
+        filename = filedialog.askopenfilename(filetypes=self.TRANSCRIPT_TYPES)
         if not filename:
             return
+        self.load_btn.config(state="disabled")
+        self._import_batch(transcript_io.read_messages(filename), filename, 0)
+
+    def _import_batch(self, reader, filename, count):
+        # Parse a slice per tick so huge transcripts don't freeze the main loop. Each slice
+        # goes straight into the store and journal; the chat is drawn once at the end.
         try:
-            loaded = []
-            if filename.endswith(".json"):
-                with open(filename, "r", encoding="utf-8") as f:
-                    loaded = json.load(f)
-            else:
-                with open(filename, "r", encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        # Basic parsing for txt files: "[HH:MM:SS] Sender: Text"
-                        parts = line.split(" ", 2)
-                        if len(parts) >= 3 and parts[0].startswith("[") and parts[0].endswith("]") and ":" in parts[1]:
-                            time_str = parts[0][1:-1]
-                            sender = parts[1][:-1]  # Remove colon
-                            text = parts[2]
-                        else:
-                            time_str = ""
-                            sender = "User"
-                            text = line
-                        loaded.append({"sender": sender, "text": text, "time": time_str})
-            self.conversation = loaded
-            self._refresh_chat()
-            messagebox.showinfo("Success", f"Conversation loaded from {filename}")
+            batch = list(itertools.islice(reader, self.IMPORT_BATCH))
         except Exception as e:
+            self.load_btn.config(text="Load Conversation", state="normal")
+            if count:
+                self._refresh_chat()
+                self._index_in_background()
+                e = f"{e} (the first {count} messages were loaded)"
             messagebox.showerror("Error", f"Failed to load: {e}")
+            return
+        if not count:
+            self._set_conversation([])
+            self.journal.replace(batch)
+        else:
+            self.journal.extend(batch)
+        self.conversation.extend(batch)
+        count += len(batch)
+        if len(batch) == self.IMPORT_BATCH:
+            self.load_btn.config(text=f"Loading... {count}")
+            self.root.after(1, self._import_batch, reader, filename, count)
+            return
+        self.load_btn.config(text="Load Conversation", state="normal")
+        self._refresh_chat()
+        self._index_in_background()
+        messagebox.showinfo("Success", f"Conversation loaded from {filename}")
 
     def _load_last_session(self):
-        path = "last_session.json"
-        if os.path.exists(path):
+        # Only the newest messages are read; the journal itself keeps the full history
+        migrate = not os.path.exists(self.SESSION_PATH) and os.path.exists("last_session.json")
+        self.journal = SessionJournal(self.SESSION_PATH)
+        try:
+            if migrate:
+                # One-time import of the old whole-file session dump
+                with open("last_session.json", "r", encoding="utf-8") as f:
+                    messages = json.load(f)
+                self.journal.replace(messages)
+                self._set_conversation(messages[-self.SESSION_TAIL:])
+            else:
+                self._set_conversation(self.journal.tail(self.SESSION_TAIL))
+        except:
+            pass
+        # Flush the journal on close
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _on_close(self):
+        with metrics.timer("ui.close"):
             try:
-                with open(path, "r", encoding="utf-8") as f:
-                    self.conversation = json.load(f)
-                self._refresh_chat()
+                self.journal.close()
+                self.conversation.close()
+                self.user.end_session()
             except:
                 pass
-        # Save on close
-        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+            self.api_client.close()
+        if self.metrics_path:
+            try:
+                metrics.export(self.metrics_path)
+            except OSError:
+                pass
+        self.root.destroy()
 
-    def _on_close(self):
+    # === Performance dashboard ===
+
+    def _toggle_dashboard(self):
+        if self.show_dashboard.get():
+            self.dashboard_frame.pack(fill="x", padx=10, before=self.chat_frame)
+            self._refresh_dashboard()
+        else:
+            self.dashboard_frame.pack_forget()
+
+    def _refresh_dashboard(self):
+        if not self.show_dashboard.get():
+            return
+
+        def fmt(seconds):
+            return f"{seconds * 1000:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+        lines = [f"{'operation':<22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"]
+        for name, row in metrics.summary().items():
+            lines.append(f"{name:<22}{row['count']:>7}" + "".join(f"{fmt(row[k]):>10}" for k in ("p50", "p95", "p99", "max")))
+        prefetch = self.prefetcher.stats()
+        lines.append("")
+        lines.append(f"Prefetch: {prefetch['hits']}/{prefetch['hits'] + prefetch['misses']} hits "
+                     f"({prefetch['hit_rate']:.0%}), {prefetch['requests']} speculative calls, "
+                     f"{prefetch['tokens']}/{prefetch['token_budget']} tokens, {prefetch['ready']} ready"
+                     + (" (token budget spent, prefetching stopped)" if prefetch["exhausted"] else ""))
+        lines.append("Slowest recent:")
+        for seconds, name, detail, wall in metrics.slowest(5):
+            when = datetime.datetime.fromtimestamp(wall).strftime("%H:%M:%S")
+            lines.append(f"  {fmt(seconds):>9}  {name:<22}{detail[:30]:<32}{when}")
+        self.dashboard_text.config(state="normal")
+        self.dashboard_text.delete("1.0", tk.END)
+        self.dashboard_text.insert("1.0", "\n".join(lines))
+        self.dashboard_text.config(state="disabled")
+        self.root.after(self.DASHBOARD_MS, self._refresh_dashboard)
+
+    def _export_metrics(self):
+        filename = filedialog.asksaveasfilename(defaultextension=".prom",
+                                                filetypes=[("Prometheus text", "*.prom"), ("JSON Lines", "*.jsonl")])
+        if not filename:
+            return
         try:
-            with open("last_session.json", "w", encoding="utf-8") as f:
-                json.dump(self.conversation, f, indent=2)
-        except:
-            pass
-        self.root.destroy()
+            metrics.export(filename)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export metrics: {e}")
+
+    # === Session history ===
+
+    def _show_history(self):
+        # Paginated list of this user's archived sessions; only one page is loaded at a time
+        top = tk.Toplevel(self.root)
+        top.title("Past Sessions")
+        top.geometry("500x400")
+        top.transient(self.root)
+
+        filter_frame = tk.Frame(top)
+        filter_frame.pack(fill="x", padx=10, pady=5)
+        tk.Label(filter_frame, text="Subject:").pack(side="left")
+        subject = tk.StringVar(value="All")
+        subject_dropdown = ttk.Combobox(filter_frame, textvariable=subject, values=["All"] + self.SUBJECTS, state="readonly", width=10)
+        subject_dropdown.pack(side="left", padx=5)
+
+        listbox = tk.Listbox(top)
+        listbox.pack(fill="both", expand=True, padx=10)
+
+        nav_frame = tk.Frame(top)
+        nav_frame.pack(fill="x", padx=10, pady=5)
+        newer_btn = tk.Button(nav_frame, text="Newer")
+        newer_btn.pack(side="left")
+        older_btn = tk.Button(nav_frame, text="Older")
+        older_btn.pack(side="right")
+
+        cursors = [None]  # keyset cursor of every page up to the current one
+        page = {"sessions": [], "next": None}
+
+        def show_page():
+            chosen = None if subject.get() == "All" else subject.get()
+            sessions, next_cursor = self.user.past_sessions(subject=chosen, before=cursors[-1], limit=self.HISTORY_PAGE)
+            page["sessions"], page["next"] = sessions, next_cursor
+            listbox.delete(0, tk.END)
+            for session in sessions:
+                started = datetime.datetime.fromtimestamp(session["started_at"]).strftime("%Y-%m-%d %H:%M")
+                listbox.insert(tk.END, f"{started}  {session['subject'] or 'General'}  ({session['message_count']} messages)")
+            older_btn.config(state="normal" if next_cursor else "disabled")
+            newer_btn.config(state="normal" if len(cursors) > 1 else "disabled")
+
+        def older():
+            cursors.append(page["next"])
+            show_page()
+
+        def newer():
+            cursors.pop()
+            show_page()
+
+        def change_filter(event=None):
+            cursors[:] = [None]
+            show_page()
+
+        def open_session(event=None):
+            selection = listbox.curselection()
+            if selection:
+                self._show_archived_session(page["sessions"][selection[0]])
+
+        older_btn.config(command=older)
+        newer_btn.config(command=newer)
+        subject_dropdown.bind("<<ComboboxSelected>>", change_filter)
+        listbox.bind("<Double-Button-1>", open_session)
+        show_page()
+
+    def _show_archived_session(self, session):
+        # Read-only view of a past session, fetched a page of messages at a time
+        top = tk.Toplevel(self.root)
+        top.title(f"Session - {session['subject'] or 'General'}")
+        top.geometry("600x450")
+        text = tk.Text(top, wrap="word", font=("Arial", self.font_size_var.get()))
+        text.pack(fill="both", expand=True, padx=10, pady=5)
+        more_btn = tk.Button(top, text="Load more")
+        more_btn.pack(pady=5)
+        loaded = {"count": 0}
+
+        def load_more():
+            messages = self.user.archive.get_messages(session["id"], loaded["count"], self.HISTORY_MESSAGES_PAGE)
+            loaded["count"] += len(messages)
+            text.config(state="normal")
+            text.insert(tk.END, "".join(self._format_message(m) for m in messages))
+            text.config(state="disabled")
+            if loaded["count"] >= session["message_count"]:
+                more_btn.config(state="disabled")
+
+        more_btn.config(command=load_more)
+        load_more()
 
     # === Search functionality ===
 
+    def _index_messages(self, limit=None):
+        # Add not-yet-indexed messages to the search index, at most `limit` of them
+        end = len(self.conversation) if limit is None else min(len(self.conversation), self._indexed_upto + limit)
+        for i in range(self._indexed_upto, end):
+            self.message_index.add(i, self.conversation.text(i))
+        self._indexed_upto = end
+        return end < len(self.conversation)
+
+    def _index_in_background(self):
+        # Index a loaded conversation in small slices so the UI stays responsive
+        if self._index_messages(limit=2000):
+            self.root.after(1, self._index_in_background)
+
     def _search_chat(self, event=None, prev=False):
-        term = self.search_var.get().lower()
+        term = self.search_var.get().strip()
         if not term:
+            self._search_term = None
+            self._highlight_matches()
             return
+        self._index_messages()
+        if term != self._search_term or self._search_version != self.message_index.version:
+            # New term or changed conversation: results are stale
+            if term != self._search_term:
+                self._search_current = None
+            self.search_results = self.message_index.search(term)
+            self._search_term, self._search_version = term, self.message_index.version
         if not self.search_results:
-            # Find all matches
-            self.search_results = [i for i, msg in enumerate(self.conversation) if term in msg['text'].lower()]
-            self.search_index = 0 if not prev else len(self.search_results) - 1
-        else:
-            # Navigate results
-            if prev:
-                self.search_index = (self.search_index - 1) % len(self.search_results)
-            else:
-                self.search_index = (self.search_index + 1) % len(self.search_results)
-        if not self.search_results:
+            self._highlight_matches()
             messagebox.showinfo("Search", "No matches found.")
             return
-        idx = self.search_results[self.search_index]
-        # Scroll chat to message index
-        self.chat_text.config(state="normal")
-        self.chat_text.tag_remove("search", "1.0", tk.END)
-        line_index = idx + 1
+        # Step from the current match, which stays valid even if the results changed
+        current = self._search_current
+        if current is None:
+            self.search_index = len(self.search_results) - 1 if prev else 0
+        elif prev:
+            self.search_index = (bisect.bisect_left(self.search_results, current) - 1) % len(self.search_results)
+        else:
+            self.search_index = bisect.bisect_right(self.search_results, current) % len(self.search_results)
+        self._search_current = idx = self.search_results[self.search_index]
+
+        # Scroll chat to the message and highlight every match in view
+        line_index = self._message_line(idx)
+        self._highlight_matches()
         self.chat_text.see(f"{line_index}.0")
-        start = f"{line_index}.0"
-        end = f"{line_index}.end"
-        self.chat_text.tag_add("search", start, end)
-        self.chat_text.tag_config("search", background="yellow", foreground="black")
-        self.chat_text.config(state="disabled")
+
+    def _highlight_matches(self):
+        self.chat_text.tag_remove("search", "1.0", tk.END)
+        self.chat_text.tag_remove("search_current", "1.0", tk.END)
+        if not self._search_term or not self.search_results:
+            return
+        lo = bisect.bisect_left(self.search_results, self._view_start)
+        hi = bisect.bisect_left(self.search_results, self._view_end)
+        line_starts = [1] + list(itertools.accumulate(self._view_lines))
+        for idx in self.search_results[lo:hi]:
+            item = self.conversation[idx]
+            line = line_starts[idx - self._view_start]
+            offset = len(self._format_message(item)) - len(item['text']) - 1  # "[time] Sender: " prefix
+            tag = "search_current" if idx == self._search_current else "search"
+            for s, e in match_spans(item['text'], self._search_term):
+                self.chat_text.tag_add(tag, f"{line}.0 + {offset + s} chars", f"{line}.0 + {offset + e} chars")
 
     # === Input and message sending ===
 
+    @metrics.timed("ui.on_enter")
     def _on_enter(self, event=None):
         question = self.user_input.get().strip()
+        if self._image_loading:
+            messagebox.showinfo("Please wait", "The attached image is still being prepared.")
+            return
         if not question and not self.attached_image:
             return
+
+        # Queue the request first so a full queue leaves the input untouched
+        try:
+            request = self.api_client.submit(self._call_api, question, self.subject_var.get(), self.attached_image, priority=INTERACTIVE)
+        except QueueFullError:
+            messagebox.showwarning("Busy", "Too many questions are waiting. Please wait for an answer.")
+            return
         self.user_input.delete(0, tk.END)
 
         # Show user input in chat
+        self._scroll_to_bottom()
+        self._clear_notices()
         text = question if question else "(Image sent)"
-        self._append_message("You", text)
+        asked = self._append_message("You", text)
 
-        # Disable input & show typing indicator
-        self._set_input_state(False)
-        self._show_typing_indicator()
-
-        # Call API with delay in separate thread
-        threading.Thread(target=self._call_api, args=(question, self.attached_image), daemon=True).start()
+        # Show a typing indicator until this request finishes
+        self._show_typing_indicator(request.id)
+        self._pending[request.id]["asked"] = (asked.index, self.conversation.generation)
+        request.add_done_callback(lambda r: self.root.after(0, self._finish_request, r))
         self.attached_image = None  # reset after sending
+        self._update_queue_status()
 
-    def _set_input_state(self, enabled):
-        state = "normal" if enabled else "disabled"
-        self.user_input.config(state=state)
-        self.send_btn.config(state=state)
-        self.upload_btn.config(state=state)
-        self.emoji_btn.config(state=state)
+    def _cancel_request(self, event=None):
+        # Cancel the most recent outstanding question
+        if self._pending:
+            self.api_client.cancel(next(reversed(self._pending)))
 
-    def _show_typing_indicator(self):
-        self._append_message("Bot", "Typing...")
+    def _update_queue_status(self):
+        waiting, running = self.api_client.queue_depth(), self.api_client.in_flight()
+        self.queue_label.config(text=f"Queue: {waiting} waiting, {running} running" if waiting or running else "")
+        self.cancel_btn.config(state="normal" if self._pending else "disabled")
 
-    def _remove_typing_indicator(self):
-        # Remove last Bot "Typing..." message
-        if self.conversation and self.conversation[-1]["text"] == "Typing...":
-            self.conversation.pop()
-            self._refresh_chat()
+    def _poll_queue_status(self):
+        self._update_queue_status()
+        self.root.after(500, self._poll_queue_status)
+
+    def _show_typing_indicator(self, request_id):
+        now = datetime.datetime.now().strftime("%H:%M:%S")
+        self._pending[request_id] = {"sender": "Bot", "text": "Typing...", "time": now}
+        self.chat_text.config(state="normal")
+        self._render_live()
+        self.chat_text.see(tk.END)
+        self.chat_text.config(state="disabled")
+
+    def _update_typing_indicator(self, request_id, text):
+        # Rewrite a typing indicator in place
+        if request_id not in self._pending:
+            return
+        self._pending[request_id]["text"] = text
+        self.chat_text.config(state="normal")
+        self._render_live()
+        self.chat_text.config(state="disabled")
+
+    def _show_notice(self, sender, text):
+        now = datetime.datetime.now().strftime("%H:%M:%S")
+        self._notices.append({"sender": sender, "text": text, "time": now})
+        self.chat_text.config(state="normal")
+        self._render_live()
+        self.chat_text.see(tk.END)
+        self.chat_text.config(state="disabled")
+
+    def _clear_notices(self):
+        if not self._notices:
+            return
+        self._notices = []
+        self.chat_text.config(state="normal")
+        self._render_live()
+        self.chat_text.config(state="disabled")
+
+    def _remove_typing_indicator(self, request_id):
+        if self._pending.pop(request_id, None) is None:
+            return
+        self.chat_text.config(state="normal")
+        self._render_live()
+        self.chat_text.config(state="disabled")
+
+    @metrics.timed("gui.call_api")
+    def _call_api(self, text, subject, image_bytes):
+        # Runs on a scheduler worker thread; returns the full reply
+        if not image_bytes:
+            # Greetings, arithmetic and unit conversions never reach the model
+            route = self.router.route(text, subject)
+            if route.answer is not None:
+                return route.answer
+            subject = route.subject
+
+        context = self.user.context
+        cached = self.api_client.cached_response(text, subject, image_bytes, context=context)
+        if cached is not None:
+            return cached  # no network call, no artificial delay
+
+        if not image_bytes and self.prefetch_enabled.get():
+            answer = self.prefetcher.take(text, subject, context)
+            if answer is not None:
+                return answer  # generated while the student was reading
+            if current_request().cancelled():
+                return None
+
+        if self.stream_responses.get():
+            return self._stream_api(text, subject, context, image_bytes)
 
-    def _call_api(self, text, image_bytes):
         delay = self.ai_delay.get()
         time.sleep(delay)  # simulate thinking delay
+        if current_request().cancelled():
+            return None
+
+        return self.api_client.get_response(text, subject, check_cache=False, context=context,
+                                            image_bytes=image_bytes)
+
+    def _stream_api(self, text, subject, context=None, image_bytes=None):
+        # No artificial delay here: the first chunk is the latency the user sees
+        request_id = current_request().id
+        parts = []
+        for chunk in self.api_client.stream_response(text, subject, check_cache=False, context=context,
+                                                     image_bytes=image_bytes):
+            parts.append(chunk)
+            with self._stream_lock:
+                self._stream_chunks.append((request_id, chunk))
+                if self._flush_scheduled:
+                    continue
+                self._flush_scheduled = True
+            self.root.after(self.STREAM_FLUSH_MS if len(parts) > 1 else 0, self._flush_stream)
+        return "".join(parts)
+
+    @metrics.timed("ui.stream_flush")
+    def _flush_stream(self):
+        # Batch every chunk received since the last flush into one widget update
+        with self._stream_lock:
+            chunks, self._stream_chunks = self._stream_chunks, []
+            self._flush_scheduled = False
+        if not chunks:
+            return
+        for request_id, chunk in chunks:
+            if request_id in self._pending:
+                self._stream_text[request_id] = self._stream_text.get(request_id, "") + chunk
+        self.chat_text.config(state="normal")
+        for request_id, text in self._stream_text.items():
+            self._pending[request_id]["text"] = text
+        self._render_live()
+        self.chat_text.see(tk.END)
+        self.chat_text.config(state="disabled")
 
-        # Actually call the API client (replace with real call)
-        if image_bytes:
-            response = self.api_client.get_response(text, image_bytes=image_bytes)
+    def _finish_request(self, request):
+        # Replace the typing indicator with the reply, or note the cancellation/failure
+        self._flush_stream()
+        partial = self._stream_text.pop(request.id, "")
+        asked, generation = self._pending.get(request.id, {}).get("asked", (None, None))
+        self._remove_typing_indicator(request.id)
+        if request.future.cancelled():
+            self._show_notice("Bot", f"{partial} (cancelled)" if partial else "(cancelled)")
+        elif request.future.exception() is not None:
+            # Shown as a notice, never recorded as the answer
+            error = request.future.exception()
+            if isinstance(error, BackendUnavailable):
+                notice = f"The tutor is unavailable right now. Please try again in {error.retry_after:.0f} seconds."
+            else:
+                notice = f"Couldn't get an answer ({error}). Please try again."
+            self._show_notice("System", f"{partial} ... {notice}" if partial else notice)
         else:
-            response = self.api_client.get_response(text)
-
-        # Update UI on main thread
-        self.root.after(0, self._update_bot_response, response)
-
-    def _update_bot_response(self, response):
-        self._remove_typing_indicator()
-        self._append_message("Bot", response)
-        self._set_input_state(True)
+            response = request.future.result()
+            answer = self._append_message("Bot", response)
+            question, subject, _ = request.args
+            # End to end: queued, answered and shown
+            metrics.observe("ui.answer", time.perf_counter() - request.submitted, question)
+            # The profile points at both messages; if another conversation was loaded meanwhile
+            # the question is gone and the turn is only archived
+            same = generation == self.conversation.generation
+            self.user.add_to_history(question, response, subject, indices=(asked, answer.index) if same else ())
+            self._schedule_prefetch()
+        self._update_queue_status()
+
+    # === Prefetching ===
+
+    def _schedule_prefetch(self, event=None):
+        # (Re)starts the idle timer
+        if self._prefetch_job is not None:
+            self.root.after_cancel(self._prefetch_job)
+            self._prefetch_job = None
+        if self.prefetch_enabled.get():
+            self._prefetch_job = self.root.after(self.PREFETCH_IDLE_MS, self._prefetch)
+
+    def _toggle_prefetch(self):
+        self._schedule_prefetch()
+        if not self.prefetch_enabled.get():
+            self.prefetcher.cancel()
+
+    def _prefetch(self):
+        self._prefetch_job = None
+        if self._pending:
+            return  # rescheduled when the outstanding answer arrives
+        # Routed like a real question, so the subject (and answer key) match when it is asked
+        subject = self.subject_var.get()
+        context = self.user.context
+        questions = self.QUICK_REPLIES + (list(FOLLOW_UPS) if context.render() else [])
+        candidates = []
+        for text in questions:
+            route = self.router.route(text, subject, record=False)
+            if route.answer is None:
+                candidates.append((text, route.subject))
+        self.prefetcher.prefetch(candidates, context)
 
     # === Image attachment ===
 
@@ -388,12 +1008,34 @@ class TutorBotGUI:
             filetypes=[("Image files", "*.png *.jpg *.jpeg *.bmp")]
         )
         if filename:
+            self._attach_image(filename)
+
+    def _attach_image(self, path):
+        # Decoding and downscaling a phone photo takes a while; keep it off the UI thread
+        self._image_loading += 1
+        self.upload_btn.config(text="Preparing image...", state="disabled")
+
+        def work():
             try:
-                with open(filename, "rb") as f:
-                    self.attached_image = f.read()
-                self._append_message("You", "(Image attached)")
+                result = self.image_pipeline.load(path)
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to load image: {e}")
+                result = e
+            self.root.after(0, self._image_ready, path, result)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def _image_ready(self, path, result):
+        self._image_loading -= 1
+        if not self._image_loading:
+            self.upload_btn.config(text="Attach Image", state="normal")
+        if isinstance(result, Exception):
+            messagebox.showerror("Error", f"Failed to load image: {result}")
+            return
+        self.attached_image = result.data
+        size = f"{result.original_size // 1024} KB"
+        if result.saved > 0:
+            size += f" -> {len(result.data) // 1024} KB"
+        self._append_message("You", f"(Image attached: {os.path.basename(path)}, {size})")
 
     def _enable_drag_drop(self):
         # Windows only: support dragging image files onto window to attach
@@ -401,12 +1043,7 @@ class TutorBotGUI:
             files = self.root.tk.splitlist(event.data)
             for f in files:
                 if f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")):
-                    try:
-                        with open(f, "rb") as imgf:
-                            self.attached_image = imgf.read()
-                        self._append_message("You", f"(Image attached: {os.path.basename(f)})")
-                    except Exception as e:
-                        messagebox.showerror("Error", f"Failed to load image: {e}")
+                    self._attach_image(f)
                 else:
                     messagebox.showwarning("Invalid file", "Only image files are supported.")
             return "break"
@@ -1,14 +1,18 @@
+import argparse
 import os
-import tkinter as tk
-from dotenv import load_dotenv
+import threading
 from pathlib import Path
-from api_handler import APIClient
-from user_profile import UserProfile
-from gui import TutorBotGUI 
-from tkinter import ttk, filedialog
+
+# Heavy modules (the Gemini SDK, NumPy) are imported lazily so the window can
+# appear before they load; see warm_up()
 
 # Optional: fallback console chat mode
 def chat_loop(api):
+    from context_manager import ConversationContext
+    from question_logic import QuestionRouter
+    from resilience import BackendError
+    router = QuestionRouter()
+    context = ConversationContext()
     print("Chatbot started! Type 'exit' to quit.")
     while True:
         try:
@@ -19,26 +23,93 @@ def chat_loop(api):
         if user_input.lower() == "exit":
             print("Goodbye!")
             break
-        response = api.get_response(user_input)
+        route = router.route(user_input)
+        try:
+            response = route.answer if route.answer is not None else api.get_response(user_input, route.subject, context=context)
+        except BackendError as e:
+            print(f"(Couldn't get an answer: {e})")
+            continue
         print("Bot:", response)
+        context.add_turn(user_input, response)
+
+def rate_limit():
+    # Client-side cap on model calls per second (GEMINI_RATE_LIMIT in .env); none by default
+    return float(os.getenv("GEMINI_RATE_LIMIT", "0")) or None
+
+def warm_up(api):
+    # Runs in the background after the first frame: SDK import, model, semantic cache, scheduler
+    api.load_backend()
+    import semantic_cache
+    # Paraphrase matching is only available when NumPy is installed
+    if semantic_cache.AVAILABLE:
+        api.semantic_cache = semantic_cache.SemanticCache()
+    api.scheduler
+
+def build_app(api_key, metrics_path=None):
+    from api_handler import APIClient
+    from response_cache import ResponseCache
+    from session_archive import SessionArchive
+    from message_store import MessageStore
+    from user_profile import UserProfile
+    from gui import TutorBotGUI
+
+    # Kiosk sessions can run for days: keep the newest texts in memory and spill older ones to disk
+    user = UserProfile("Guest", archive=SessionArchive("sessions.db"), messages=MessageStore(max_in_memory=20_000))
+    api = APIClient(api_key, cache=ResponseCache("response_cache.db"), lazy=True, rate_limit=rate_limit())
+    app = TutorBotGUI(api_client=api, user=user, metrics_path=metrics_path)
+    # Idle callbacks run after the pending redraws, i.e. once the window is painted
+    app.root.after_idle(lambda: threading.Thread(target=warm_up, args=(api,), name="warm-up", daemon=True).start())
+    return app
+
+def run_server(api_key, host, port, metrics_path=None):
+    # Headless mode: many students share one API client
+    import asyncio
+    from api_handler import APIClient
+    from response_cache import ResponseCache
+    from session_archive import SessionArchive
+    from server import TutorServer
+
+    api = APIClient(api_key, cache=ResponseCache("response_cache.db"), max_concurrency=32, max_queue=2048,
+                    rate_limit=rate_limit())
+    warm_up(api)
+    server = TutorServer(api, archive=SessionArchive("sessions.db"))
+    try:
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+        if metrics_path:
+            from metrics import metrics
+            metrics.export(metrics_path)
 
 def main():
+    parser = argparse.ArgumentParser(description="Tutor Bot - Homework Helper")
+    parser.add_argument("--server", action="store_true", help="run the headless multi-user server instead of the GUI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--metrics", metavar="FILE", help="write timings on exit (.prom for Prometheus text, .jsonl to append)")
+    args = parser.parse_args()
+
     # Load environment variables from .env
+    from dotenv import load_dotenv
     load_dotenv(dotenv_path=Path(__file__).parent / ".env")
 
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("GEMINI_API_KEY not found in .env file")
 
-    user = UserProfile("Guest")
-    api = APIClient(api_key)
+    if args.server:
+        run_server(api_key, args.host, args.port, args.metrics)
+        return
 
     # ✅ Launch GUI instead of console
-    app = TutorBotGUI(api_client=api, user=user)
+    app = build_app(api_key, args.metrics)
     app.run()
 
     # If you ever want to run console mode instead, just use:
-    # chat_loop(api)
+    # from api_handler import APIClient
+    # chat_loop(APIClient(api_key))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,221 @@
+# message_store.py
+# Compact, append-only conversation storage with optional spill of old texts to disk
+
+import datetime
+import tempfile
+import threading
+import time
+from array import array
+
+NO_TIME = float("nan")
+
+
+def format_time(timestamp):
+    # "HH:MM:SS" for display; "" when the message has no time
+    if timestamp != timestamp:
+        return ""
+    return time.strftime("%H:%M:%S", time.localtime(timestamp))
+
+
+def parse_time(value, midnight=None):
+    """Epoch seconds for a stored time: a number, or an "HH:MM:SS" string taken as today."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return NO_TIME
+    try:
+        h, m, s = value.split(":")
+        if midnight is None:
+            midnight = _midnight()
+        return midnight + int(h) * 3600 + int(m) * 60 + int(s)
+    except ValueError:
+        return NO_TIME
+
+
+def _midnight():
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    return today.timestamp()
+
+
+class Message:
+    """One message, materialized on access from the store's columns.
+
+    Item access (msg["text"], msg["time"]) works like the dicts used before,
+    with the time formatted from the epoch timestamp only when asked for.
+    """
+
+    __slots__ = ("index", "sender", "text", "timestamp")
+
+    def __init__(self, index, sender, text, timestamp):
+        self.index = index
+        self.sender = sender
+        self.text = text
+        self.timestamp = timestamp
+
+    @property
+    def time(self):
+        return format_time(self.timestamp)
+
+    def __getitem__(self, key):
+        if key not in ("sender", "text", "time"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        return {"sender": self.sender, "text": self.text, "time": self.time}
+
+
+class MessageStore:
+    """Columnar message list: interned sender ids, float epoch times and text.
+
+    With `max_in_memory`, the oldest texts are spilled to `spill_path` (an
+    anonymous temporary file by default) once more than that many are held.
+    Spilled messages cost 17 bytes of memory each and are read back on access.
+    Appends come from one thread; reads are safe from any thread.
+    """
+
+    def __init__(self, max_in_memory=None, spill_path=None):
+        self.max_in_memory = max_in_memory
+        self.spill_path = spill_path
+        self._sender_names = []
+        self._sender_ids = {}
+        self._senders = array("H")
+        self._times = array("d")
+        self._texts = []  # texts of messages [self._spilled:]
+        self._spilled = 0
+        self._offsets = array("Q", [0])  # spilled text i is file bytes [offsets[i], offsets[i + 1])
+        self._file = None
+        self._lock = threading.Lock()
+        # Bumped whenever existing messages are replaced, so held indices can be checked
+        self.generation = 0
+
+    def __len__(self):
+        return len(self._times)
+
+    def _sender_id(self, sender):
+        sender_id = self._sender_ids.get(sender)
+        if sender_id is None:
+            sender_id = self._sender_ids[sender] = len(self._sender_names)
+            self._sender_names.append(sender)
+        return sender_id
+
+    def append(self, sender, text, timestamp=None):
+        """Adds a message (timestamped now by default); returns its index."""
+        with self._lock:
+            self._senders.append(self._sender_id(sender))
+            self._times.append(time.time() if timestamp is None else timestamp)
+            self._texts.append(text)
+            if self.max_in_memory and len(self._texts) > self.max_in_memory:
+                self._spill(max(1, self.max_in_memory // 4))
+            return len(self._times) - 1
+
+    def extend(self, messages):
+        # Message dicts ({"sender", "text", "time"}) or Message objects
+        midnight = _midnight()
+        for msg in messages:
+            if isinstance(msg, Message):
+                self.append(msg.sender, msg.text, msg.timestamp)
+            else:
+                self.append(msg["sender"], msg["text"], parse_time(msg.get("time"), midnight))
+
+    def replace(self, messages):
+        self.clear()
+        self.extend(messages)
+
+    def clear(self):
+        with self._lock:
+            self._senders = array("H")
+            self._times = array("d")
+            self._texts = []
+            self._spilled = 0
+            self._offsets = array("Q", [0])
+            if self._file is not None:
+                self._file.seek(0)
+                self._file.truncate()
+            self.generation += 1
+
+    # === Spill ===
+
+    def _spill(self, count):
+        # Moves the oldest `count` in-memory texts to the end of the spill file
+        if self._file is None:
+            self._file = open(self.spill_path, "w+b") if self.spill_path else tempfile.TemporaryFile()
+        chunk = [text.encode("utf-8") for text in self._texts[:count]]
+        self._file.seek(self._offsets[-1])
+        self._file.write(b"".join(chunk))
+        end = self._offsets[-1]
+        for data in chunk:
+            end += len(data)
+            self._offsets.append(end)
+        del self._texts[:count]
+        self._spilled += count
+
+    def _read_spilled(self, start, end):
+        # Texts of spilled messages [start, end) with one read
+        self._file.seek(self._offsets[start])
+        data = self._file.read(self._offsets[end] - self._offsets[start])
+        base = self._offsets[start]
+        return [data[self._offsets[i] - base:self._offsets[i + 1] - base].decode("utf-8") for i in range(start, end)]
+
+    # === Access ===
+
+    def texts(self, start, end):
+        with self._lock:
+            end = min(end, len(self._times))
+            if start >= end:
+                return []
+            spilled = self._read_spilled(start, min(end, self._spilled)) if start < self._spilled else []
+            if end <= self._spilled:
+                return spilled
+            return spilled + self._texts[max(start, self._spilled) - self._spilled:end - self._spilled]
+
+    def text(self, index):
+        return self.texts(index, index + 1)[0]
+
+    def sender(self, index):
+        return self._sender_names[self._senders[index]]
+
+    def timestamp(self, index):
+        return self._times[index]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("MessageStore slices must be contiguous")
+            return self.range(start, stop)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError(key)
+        return Message(key, self.sender(key), self.text(key), self._times[key])
+
+    def range(self, start, end):
+        names = self._sender_names
+        texts = self.texts(start, end)
+        return [Message(start + i, names[self._senders[start + i]], text, self._times[start + i])
+                for i, text in enumerate(texts)]
+
+    def __iter__(self):
+        return self.iter_messages()
+
+    def iter_messages(self, start=0, end=None, batch=1000):
+        # Batched so spilled texts are read sequentially; stops at the length seen on entry
+        end = len(self) if end is None else min(end, len(self))
+        for i in range(start, end, batch):
+            yield from self.range(i, min(i + batch, end))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def memory_stats(self):
+        return {"messages": len(self), "in_memory": len(self._texts), "spilled": self._spilled,
+                "senders": len(self._sender_names)}
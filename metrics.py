@@ -0,0 +1,172 @@
+# metrics.py
+# Low-overhead timers and latency histograms for the hot paths, with file export
+
+import bisect
+import functools
+import json
+import threading
+import time
+from collections import deque
+
+# Log-spaced bucket bounds in seconds, 50us .. ~2min (each ~26% wider than the last)
+BUCKETS = [0.00005 * 1.26 ** i for i in range(64)]
+
+
+class Histogram:
+    """Bucketed latency distribution; quantiles are accurate to one bucket (~13%)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                # Geometric midpoint of the bucket, capped by the largest value seen
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                lower = BUCKETS[i - 1] if i else 0.0
+                return min((lower * upper) ** 0.5 if lower else upper, self.max)
+        return self.max
+
+
+class Metrics:
+    """Named histograms and counters, plus a ring of the most recent timed operations.
+
+    observe(), timer() and increment() are safe from any thread. Set `enabled` to False to
+    turn every call into a no-op.
+    """
+
+    def __init__(self, recent=500):
+        self.enabled = True
+        self._histograms = {}
+        self._counters = {}
+        self._recent = deque(maxlen=recent)  # (seconds, name, detail, wall time)
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, detail=""):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+            self._recent.append((seconds, name, detail, time.time()))
+
+    def increment(self, name, amount=1):
+        # Counts things that aren't durations, e.g. hits or tokens
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def timer(self, name, detail=""):
+        return _Timer(self, name, detail)
+
+    def timed(self, name):
+        # Decorator form of timer()
+        def wrap(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, name, ""):
+                    return func(*args, **kwargs)
+            return wrapper
+        return wrap
+
+    def summary(self):
+        # {name: {count, mean, p50, p95, p99, max}} in seconds
+        with self._lock:
+            return {
+                name: {
+                    "count": h.count,
+                    "mean": h.sum / h.count,
+                    "p50": h.quantile(0.50),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                    "max": h.max,
+                }
+                for name, h in sorted(self._histograms.items()) if h.count
+            }
+
+    def counters(self):
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def slowest(self, n=10):
+        with self._lock:
+            recent = list(self._recent)
+        return sorted(recent, reverse=True)[:n]
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._recent.clear()
+
+    # === Export ===
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for name, h in items:
+                metric = "tutorbot_" + name.replace(".", "_") + "_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                # Cumulative buckets: every bound is listed, empty ones included
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{le="{bound:.6g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {h.count}')
+                lines.append(f"{metric}_sum {h.sum:.6f}")
+                lines.append(f"{metric}_count {h.count}")
+            for name, value in sorted(self._counters.items()):
+                metric = "tutorbot_" + name.replace(".", "_") + "_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Prometheus text format for .prom/.txt files; .jsonl appends one summary snapshot."""
+        if path.endswith(".jsonl"):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"time": time.time(), "metrics": self.summary(),
+                                    "counters": self.counters()}) + "\n")
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "detail", "start")
+
+    def __init__(self, metrics, name, detail):
+        self.metrics = metrics
+        self.name = name
+        self.detail = detail
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, self.detail)
+        return False
+
+
+# Process-wide registry used by the app's instrumented paths
+metrics = Metrics()
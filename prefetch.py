@@ -0,0 +1,191 @@
+# prefetch.py
+# Speculative answers to the questions a student is likely to ask next, computed while idle
+
+import concurrent.futures
+import threading
+from collections import OrderedDict
+
+from context_manager import estimate_tokens
+from metrics import metrics
+from response_cache import make_key
+from scheduler import BACKGROUND, QueueFullError, current_request
+
+# Generic follow-ups to the last answer. They depend on the conversation, so their
+# answers are keyed by the whole prompt and go stale with the next turn.
+FOLLOW_UPS = ("Can you explain that more simply?", "Can you give me an example of that?", "Why is that?")
+
+
+class _Speculation:
+    __slots__ = ("key", "text", "subject", "shareable", "request", "started", "taken")
+
+    def __init__(self, key, text, subject, shareable):
+        self.key = key
+        self.text = text
+        self.subject = subject
+        self.shareable = shareable
+        self.request = None
+        self.started = False
+        self.taken = False  # claimed by a real question while still running
+
+
+class Prefetcher:
+    """Answers likely next questions in the background so they are ready when asked.
+
+    prefetch() is given the candidates for the current state of the
+    conversation and cancels earlier ones that no longer apply. They run
+    `max_in_flight` at a time at BACKGROUND priority, so a question the
+    student actually asked is never queued behind them. Finished answers wait
+    in a small LRU (`max_entries`) for take(). Speculation stops for the rest
+    of the session once `token_budget` estimated tokens (prompt plus answer)
+    have been spent; stats()["exhausted"] says when.
+    """
+
+    def __init__(self, api_client, max_entries=16, max_in_flight=1, token_budget=50_000):
+        self.api = api_client
+        self.max_entries = max_entries
+        self.max_in_flight = max_in_flight
+        self.token_budget = token_budget
+        self._entries = OrderedDict()  # answer key -> answer
+        self._waiting = []  # speculations not submitted yet, most likely first
+        self._running = {}  # answer key -> speculation
+        self._context = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens = 0
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, candidates, context=None):
+        """Speculate on (question, subject) pairs, replacing any earlier candidates."""
+        specs = {}
+        for text, subject in candidates:
+            key = self.api.answer_key(text, subject, context)
+            if key not in specs:
+                specs[key] = _Speculation(key, text, subject, key == make_key(text, subject))
+        with self._lock:
+            self._context = context
+            stale = [spec for key, spec in self._running.items() if key not in specs and not spec.taken]
+            self._waiting = [spec for key, spec in specs.items()
+                             if key not in self._entries and key not in self._running]
+        for spec in stale:
+            self.api.cancel(spec.request.id)
+        self._pump()
+
+    def take(self, text, subject=None, context=None):
+        """The prefetched answer to this question, or None.
+
+        An answer still being generated is waited for; one still queued is
+        cancelled so the real question goes first.
+        """
+        key = self.api.answer_key(text, subject, context)
+        with self._lock:
+            answer = self._entries.pop(key, None)
+            spec = self._running.get(key) if answer is None else None
+            if spec is not None:
+                spec.taken = True
+        if spec is not None:
+            if spec.started:
+                answer = self._wait(spec.request)
+            else:
+                self.api.cancel(spec.request.id)
+        self._count(answer is not None)
+        return answer
+
+    def cancel(self):
+        # Drops everything queued or running; finished answers are kept
+        with self._lock:
+            self._waiting = []
+            running = [spec for spec in self._running.values() if not spec.taken]
+        for spec in running:
+            self.api.cancel(spec.request.id)
+
+    def stats(self):
+        with self._lock:
+            asked = self.hits + self.misses
+            return {
+                "requests": self.requests,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / asked if asked else 0.0,
+                "tokens": self.tokens,
+                "token_budget": self.token_budget,
+                "exhausted": self.tokens >= self.token_budget,
+                "ready": len(self._entries),
+                "running": len(self._running),
+            }
+
+    # === Background work ===
+
+    def _pump(self):
+        # Submits waiting speculations while there is room and budget left
+        while True:
+            with self._lock:
+                if not self._waiting or len(self._running) >= self.max_in_flight or self.tokens >= self.token_budget:
+                    return
+                spec = self._waiting.pop(0)
+                try:
+                    spec.request = self.api.submit(self._run, spec, self._context, priority=BACKGROUND)
+                except QueueFullError:
+                    self._waiting.insert(0, spec)
+                    return
+                self._running[spec.key] = spec
+            spec.request.add_done_callback(lambda request, spec=spec: self._done(spec, request))
+
+    def _run(self, spec, context):
+        # Runs on a scheduler worker; streamed so a cancellation stops generation early
+        spec.started = True
+        if spec.shareable and self.api.cached_response(spec.text, spec.subject) is not None:
+            return None  # asking will hit the response cache anyway
+        with self._lock:
+            self.requests += 1
+        parts = []
+        # Shareable questions are the ones asked before there is any conversation to send
+        prompt_tokens = estimate_tokens(spec.text) + (0 if spec.shareable else estimate_tokens(context.render()))
+        try:
+            with metrics.timer("prefetch.run", spec.text):
+                for chunk in self.api.stream_response(spec.text, spec.subject, check_cache=False, context=context):
+                    parts.append(chunk)
+        finally:
+            # Partial answers of cancelled speculations were paid for too
+            self._spend(prompt_tokens + (estimate_tokens("".join(parts)) if parts else 0))
+        if current_request().cancelled():
+            return None
+        return "".join(parts)
+
+    def _done(self, spec, request):
+        future = request.future
+        answer = future.result() if not future.cancelled() and future.exception() is None else None
+        with self._lock:
+            if self._running.get(spec.key) is spec:
+                del self._running[spec.key]
+            if answer and not spec.taken:
+                self._entries[spec.key] = answer
+                self._entries.move_to_end(spec.key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        self._pump()
+
+    def _wait(self, request):
+        # The speculative answer, unless it fails or the waiting question is cancelled first
+        caller = current_request()
+        while True:
+            try:
+                return request.future.result(timeout=0.1)
+            except concurrent.futures.TimeoutError:
+                if caller is not None and caller.cancelled():
+                    return None
+            except (concurrent.futures.CancelledError, Exception):
+                return None
+
+    def _spend(self, tokens):
+        with self._lock:
+            self.tokens += tokens
+        metrics.increment("prefetch.tokens", tokens)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.increment("prefetch.hits" if hit else "prefetch.misses")
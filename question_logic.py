@@ -0,0 +1,228 @@
+# question_logic.py
+# Pre-dispatch stage: classify questions by subject and answer trivial ones locally
+
+import ast
+import operator
+import re
+import threading
+
+SUBJECT_KEYWORDS = {
+    "Math": r"math\w*|algebra|geometry|calculus|arithmetic|equations?|fractions?|decimals?|percent\w*|"
+            r"solve|multiply|multiplication|divide|division|add|addition|subtract\w*|sum|products?|"
+            r"derivatives?|integrals?|triangles?|angles?|area|perimeter|volume|slope|graph|polynomials?|"
+            r"\d+\s*[-+*/^x]\s*\d+",
+    "Science": r"science|biology|chemistry|physics|photosynthesis|cells?|atoms?|molecules?|electrons?|"
+               r"energy|force|gravity|mass|velocity|acceleration|chemical|elements?|periodic|ecosystems?|"
+               r"evolution|dna|genes?|planets?|solar|experiment|hypothesis",
+    "English": r"english|grammar|essays?|poems?|poetry|nouns?|verbs?|adjectives?|adverbs?|metaphors?|"
+               r"similes?|sentences?|paragraphs?|spelling|punctuation|novels?|authors?|thesis|vocabulary|"
+               r"shakespeare",
+    "History": r"history|historical|wars?|empires?|revolution|presidents?|kings?|queens?|ancient|"
+               r"medieval|century|centuries|civilization|treaty|dynasty|colonial|constitution|"
+               r"independence|rome|roman|egypt\w*",
+}
+
+# One alternation of named groups: a single regex pass finds every subject's keywords
+SUBJECT_RE = re.compile(
+    "|".join(f"(?P<{subject}>\\b(?:{pattern})\\b)" for subject, pattern in SUBJECT_KEYWORDS.items()),
+    re.IGNORECASE,
+)
+
+GREETING_RE = re.compile(r"^(hi|hello|hey|howdy|greetings|good (morning|afternoon|evening))( there)?( bot)?[\s!.]*$", re.IGNORECASE)
+THANKS_RE = re.compile(r"^(thanks|thank you|thx|ty|thanks a lot|thank you so much)( bot)?[\s!.]*$", re.IGNORECASE)
+
+ARITHMETIC_PREFIX_RE = re.compile(r"^(what is|what's|whats|calculate|compute|evaluate|solve)\s+", re.IGNORECASE)
+ARITHMETIC_RE = re.compile(r"^[\d\s.+\-*/()^%×÷]+$")
+OPERATOR_RE = re.compile(r"\d\s*[-+*/^%×÷]\s*[\d(-]")
+# "3 x 4" or "3x4" is a product; "2x-3" or "2x(3+1)" is algebra for the model
+TIMES_X_RE = re.compile(r"(?<=\d)x(?=\d)|(?<=\s)x(?=\s)")
+
+# "convert 5 km to miles" / "100 F in C"
+CONVERSION_RE = re.compile(
+    r"^(?:convert\s+)?(?P<amount>-?\d+(?:\.\d+)?)\s*(?P<source>[a-z°]+)\s+(?:to|in|into)\s+(?P<target>[a-z°]+)[\s?.!]*$",
+    re.IGNORECASE,
+)
+# "how many feet are in 3 meters"
+HOW_MANY_RE = re.compile(
+    r"^how many\s+(?P<target>[a-z°]+)\s+(?:are\s+)?(?:in|is)\s+(?P<amount>-?\d+(?:\.\d+)?)\s*(?P<source>[a-z°]+)[\s?.!]*$",
+    re.IGNORECASE,
+)
+
+# unit alias -> (dimension, factor to the base unit)
+UNITS = {}
+for aliases, dimension, factor in [
+    (("m", "meter", "meters", "metre", "metres"), "length", 1.0),
+    (("km", "kilometer", "kilometers", "kilometre", "kilometres"), "length", 1000.0),
+    (("cm", "centimeter", "centimeters", "centimetre", "centimetres"), "length", 0.01),
+    (("mm", "millimeter", "millimeters", "millimetre", "millimetres"), "length", 0.001),
+    (("mi", "mile", "miles"), "length", 1609.344),
+    (("yd", "yard", "yards"), "length", 0.9144),
+    (("ft", "foot", "feet"), "length", 0.3048),
+    (("in", "inch", "inches"), "length", 0.0254),
+    (("kg", "kilogram", "kilograms"), "mass", 1.0),
+    (("g", "gram", "grams"), "mass", 0.001),
+    (("lb", "lbs", "pound", "pounds"), "mass", 0.45359237),
+    (("oz", "ounce", "ounces"), "mass", 0.028349523125),
+    (("s", "sec", "second", "seconds"), "time", 1.0),
+    (("min", "minute", "minutes"), "time", 60.0),
+    (("h", "hr", "hour", "hours"), "time", 3600.0),
+    (("day", "days"), "time", 86400.0),
+    (("l", "liter", "liters", "litre", "litres"), "volume", 1.0),
+    (("ml", "milliliter", "milliliters", "millilitre", "millilitres"), "volume", 0.001),
+    (("gal", "gallon", "gallons"), "volume", 3.785411784),
+]:
+    for alias in aliases:
+        UNITS[alias] = (dimension, factor)
+
+TEMPERATURES = {
+    "c": "C", "°c": "C", "celsius": "C",
+    "f": "F", "°f": "F", "fahrenheit": "F",
+    "k": "K", "kelvin": "K",
+}
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+# Largest integer result safe_eval will compute (about 1200 digits); checked before each * and **
+MAX_RESULT_BITS = 4096
+
+
+class UnsafeExpression(ValueError):
+    pass
+
+
+def _result_bits(op, left, right):
+    # Upper bound on the size of an integer product or power, so it is never computed when huge
+    if not (isinstance(left, int) and isinstance(right, int)):
+        return 0  # floats overflow (OverflowError) instead of growing
+    if isinstance(op, ast.Pow):
+        return left.bit_length() * right if right > 0 else 0
+    if isinstance(op, ast.Mult):
+        return left.bit_length() + right.bit_length()
+    return 0
+
+
+def safe_eval(expression):
+    """Evaluates +, -, *, /, //, %, ** and parentheses over numbers, nothing else."""
+    def evaluate(node):
+        if isinstance(node, ast.Expression):
+            return evaluate(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            left, right = evaluate(node.left), evaluate(node.right)
+            if isinstance(node.op, ast.Pow) and abs(right) > 100:
+                raise UnsafeExpression("exponent too large")
+            if _result_bits(node.op, left, right) > MAX_RESULT_BITS:
+                raise UnsafeExpression("result too large")
+            value = _BINARY_OPS[type(node.op)](left, right)
+            if isinstance(value, complex):
+                raise UnsafeExpression("not a real number")
+            return value
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+            return _UNARY_OPS[type(node.op)](evaluate(node.operand))
+        raise UnsafeExpression(f"unsupported expression: {type(node).__name__}")
+
+    if len(expression) > 200:
+        raise UnsafeExpression("expression too long")
+    return evaluate(ast.parse(expression, mode="eval"))
+
+
+def format_number(value):
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.6g}"
+    return str(value)
+
+
+class Route:
+    def __init__(self, subject, answer=None, kind="remote"):
+        self.subject = subject
+        self.answer = answer  # set when the question was answered locally
+        self.kind = kind
+
+
+class QuestionRouter:
+    """Decides per question whether the model is needed at all.
+
+    Greetings, thanks, plain arithmetic and unit conversions are answered
+    here; everything else goes upstream with a subject.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}  # route kind -> questions
+
+    def classify(self, text, default="General"):
+        scores = {}
+        for match in SUBJECT_RE.finditer(text):
+            scores[match.lastgroup] = scores.get(match.lastgroup, 0) + 1
+        return max(scores, key=scores.get) if scores else default
+
+    def route(self, text, subject=None, record=True):
+        # A specific subject picked by the user wins over the classifier.
+        # record=False leaves the counts alone, for questions nobody has asked yet.
+        if not subject or subject == "General":
+            subject = self.classify(text, subject or "General")
+        route = self._answer_locally(text.strip(), subject) or Route(subject)
+        if not record:
+            return route
+        with self._lock:
+            self.counts[route.kind] = self.counts.get(route.kind, 0) + 1
+        return route
+
+    def _answer_locally(self, text, subject):
+        if GREETING_RE.match(text):
+            return Route(subject, "Hello! What are we working on today?", "greeting")
+        if THANKS_RE.match(text):
+            return Route(subject, "You're welcome! Let me know if you have another question.", "thanks")
+        answer = self._arithmetic(text)
+        if answer is not None:
+            return Route("Math", answer, "arithmetic")
+        answer = self._conversion(text)
+        if answer is not None:
+            return Route(subject, answer, "conversion")
+        return None
+
+    def _arithmetic(self, text):
+        expression = ARITHMETIC_PREFIX_RE.sub("", text).rstrip(" ?=.!")
+        python_expr = TIMES_X_RE.sub("*", expression)
+        if not ARITHMETIC_RE.match(python_expr) or not OPERATOR_RE.search(python_expr):
+            return None
+        python_expr = python_expr.replace("^", "**").replace("×", "*").replace("÷", "/")
+        try:
+            answer = format_number(safe_eval(python_expr))
+        except ZeroDivisionError:
+            return f"{expression} is undefined, because you can't divide by zero."
+        except (ValueError, SyntaxError, OverflowError):
+            # UnsafeExpression, or an int too long to print (over sys.get_int_max_str_digits())
+            return None
+        return f"{expression} = {answer}"
+
+    def _conversion(self, text):
+        match = CONVERSION_RE.match(text) or HOW_MANY_RE.match(text)
+        if not match:
+            return None
+        amount, source, target = float(match["amount"]), match["source"].lower(), match["target"].lower()
+        if source in TEMPERATURES and target in TEMPERATURES:
+            celsius = {"C": lambda v: v, "F": lambda v: (v - 32) * 5 / 9, "K": lambda v: v - 273.15}[TEMPERATURES[source]](amount)
+            value = {"C": lambda c: c, "F": lambda c: c * 9 / 5 + 32, "K": lambda c: c + 273.15}[TEMPERATURES[target]](celsius)
+        elif source in UNITS and target in UNITS and UNITS[source][0] == UNITS[target][0]:
+            value = amount * UNITS[source][1] / UNITS[target][1]
+        else:
+            return None
+        return f"{format_number(amount)} {match['source']} = {format_number(value)} {match['target']}"
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.counts.values())
+            local = total - self.counts.get("remote", 0)
+            return {"total": total, "local": local, "local_share": local / total if total else 0.0, **self.counts}
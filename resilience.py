@@ -0,0 +1,217 @@
+# resilience.py
+# Timeouts, jittered retries, a circuit breaker and client-side rate limiting for model calls
+
+import random
+import threading
+import time
+
+from metrics import metrics
+from scheduler import current_request
+
+# Exception class names the Gemini SDK (google.api_core) and the stdlib use for
+# failures worth retrying; matched by name so the SDK isn't imported here
+TRANSIENT_NAMES = frozenset({
+    "ServiceUnavailable", "DeadlineExceeded", "ResourceExhausted", "TooManyRequests",
+    "InternalServerError", "BadGateway", "GatewayTimeout", "Aborted", "RetryError",
+})
+TRANSIENT_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class BackendError(Exception):
+    """The model could not produce an answer; never shown as one."""
+
+
+class BackendUnavailable(BackendError):
+    # Fail-fast while the circuit is open; retry_after is in seconds
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimited(BackendError):
+    pass
+
+
+def is_transient(error):
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in TRANSIENT_NAMES:
+        return True
+    return getattr(error, "code", None) in TRANSIENT_CODES
+
+
+def _sleep(seconds):
+    # Sleeps unless the calling request is cancelled first; returns False if it was
+    request = current_request()
+    if request is None:
+        time.sleep(seconds)
+        return True
+    return not request.wait_cancelled(seconds)
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        # Takes a token, possibly going into debt; returns how long to wait for it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, max_wait=None):
+        wait = self._reserve()
+        if max_wait is not None and wait > max_wait:
+            with self._lock:
+                self._tokens += 1  # give the reservation back
+            raise RateLimited(f"rate limit: next slot in {wait:.1f}s")
+        if wait:
+            metrics.observe("api.rate_limit_wait", wait)
+            if not _sleep(wait):
+                raise BackendError("cancelled while waiting for a rate limit slot")
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; while open every call
+    fails fast. After `reset_timeout` seconds one trial call is let through and
+    its outcome closes or re-opens the circuit; a trial abandoned without an
+    outcome is released so the next caller becomes the trial.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self._opened = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self._opened + self.reset_timeout - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half-open"
+                return  # this caller is the trial
+            raise BackendUnavailable("The tutor service is temporarily unavailable", max(remaining, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def release(self):
+        # The trial ended without an outcome (e.g. its stream was closed early)
+        with self._lock:
+            if self.state == "half-open":
+                self.state = "open"
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self._opened = time.monotonic()
+
+
+class ResilientCaller:
+    """Runs model calls with rate limiting, retries on transient errors and a circuit breaker.
+
+    fn(timeout) does one attempt. Retries use full-jitter exponential backoff
+    (a random wait up to base * 2**attempt, capped), so clients that failed
+    together don't retry together.
+    """
+
+    def __init__(self, timeout=30.0, attempts=3, backoff_base=0.5, backoff_cap=8.0,
+                 breaker=None, limiter=None, rate_limit_wait=10.0):
+        self.timeout = timeout
+        self.attempts = attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        self.rate_limit_wait = rate_limit_wait
+        self.retries = 0
+        self.failures = 0
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _before_attempt(self):
+        # Rate limit first: a caller let through as the breaker's trial must not then wait
+        if self.limiter is not None:
+            self.limiter.acquire(self.rate_limit_wait)
+        self.breaker.allow()
+
+    def _retry(self, error, attempt):
+        # Records the failure; returns True if the caller should try again (after the backoff)
+        if not is_transient(error):
+            # The backend answered, just not with a result (e.g. a bad request)
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        if attempt + 1 >= self.attempts:
+            return False
+        self.retries += 1
+        return _sleep(self.backoff(attempt))
+
+    def _fail(self, error):
+        self.failures += 1
+        if isinstance(error, BackendError):
+            raise error
+        raise BackendError(f"{type(error).__name__}: {error}") from error
+
+    def call(self, fn):
+        attempt = 0
+        while True:
+            self._before_attempt()
+            try:
+                result = fn(self.timeout)
+            except Exception as e:
+                if self._retry(e, attempt):
+                    attempt += 1
+                    continue
+                self._fail(e)
+            self.breaker.record_success()
+            return result
+
+    def stream(self, make_iter):
+        # call() for streamed answers; retried only while nothing has been yielded yet
+        attempt = 0
+        while True:
+            self._before_attempt()
+            started = False
+            try:
+                for chunk in make_iter(self.timeout):
+                    started = True
+                    yield chunk
+            except GeneratorExit:
+                # Closed by the consumer mid-answer: neither a success nor a failure
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not started and self._retry(e, attempt):
+                    attempt += 1
+                    continue
+                if started and is_transient(e):
+                    self.breaker.record_failure()
+                self._fail(e)
+            self.breaker.record_success()
+            return
+
+    def stats(self):
+        return {"retries": self.retries, "failures": self.failures,
+                "breaker": self.breaker.state, "trips": self.breaker.trips}
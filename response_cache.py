@@ -0,0 +1,140 @@
+# response_cache.py
+# Two-tier cache of model answers: in-memory LRU in front of a SQLite file
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(prompt):
+    # Case, spacing and trailing punctuation don't change the question
+    return " ".join(prompt.lower().split()).rstrip(" ?!.")
+
+
+def image_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest() if image_bytes else ""
+
+
+def make_key(prompt, subject=None, image_bytes=None):
+    raw = "\0".join([normalize_prompt(prompt or ""), (subject or "").lower(), image_hash(image_bytes)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Content-addressed answer cache.
+
+    Entries expire after `ttl` seconds. The disk tier keeps at most
+    `max_entries` answers and `max_bytes` of answer text (UTF-8), evicting
+    the least recently used ones; the memory tier holds `memory_size` answers.
+    """
+
+    # Expired and over-limit rows are removed every this many puts
+    EVICT_EVERY = 100
+
+    def __init__(self, path="response_cache.db", memory_size=256, max_entries=10000, ttl=7 * 24 * 3600,
+                 max_bytes=64 * 1024 * 1024):
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (response, created)
+        self._touched = {}  # key -> time of memory hits not yet written to the disk tier
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self._touched[key] = now
+                self.hits += 1
+                self.memory_hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._memory[key]
+
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._remember(key, row[0], row[1])
+            self.hits += 1
+            self.disk_hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._puts += 1
+            if self._puts % self.EVICT_EVERY == 0:
+                self._evict(now)
+            self._db.commit()
+
+    def _remember(self, key, response, created):
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        # Memory hits count as uses too, so popular answers aren't the first to go
+        self._db.executemany("UPDATE responses SET accessed = ? WHERE key = ?",
+                             [(accessed, key) for key, accessed in self._touched.items()])
+        self._touched.clear()
+        self._db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        # Then the least recently used answers past the first max_bytes
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM (SELECT key, SUM(length(CAST(response AS BLOB)))"
+            "  OVER (ORDER BY accessed DESC, rowid DESC) AS total FROM responses)"
+            " WHERE total > ?)",
+            (self.max_bytes,),
+        )
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,153 @@
+# scheduler.py
+# Runs API calls on one asyncio event loop thread with bounded concurrency
+
+import concurrent.futures
+import itertools
+import threading
+import time
+
+from metrics import metrics
+
+# Request priorities: lower runs first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+_local = threading.local()
+
+
+def current_request():
+    """The ScheduledRequest being run on this thread, if any."""
+    return getattr(_local, "request", None)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class ScheduledRequest:
+    def __init__(self, request_id, func, args, priority):
+        self.id = request_id
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.future = concurrent.futures.Future()
+        self._cancel_event = threading.Event()
+        self.submitted = time.perf_counter()
+
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def wait_cancelled(self, timeout):
+        # Sleeps up to timeout seconds, waking early on cancellation; returns cancelled()
+        return self._cancel_event.wait(timeout)
+
+    def add_done_callback(self, fn):
+        # fn(request) runs on whichever thread finishes or cancels the request
+        self.future.add_done_callback(lambda f: fn(self))
+
+    def _call(self):
+        _local.request = self
+        started = time.perf_counter()
+        metrics.observe("scheduler.queue_wait", started - self.submitted)
+        try:
+            return self.func(*self.args)
+        finally:
+            _local.request = None
+            metrics.observe("scheduler.run", time.perf_counter() - started, getattr(self.func, "__name__", ""))
+
+    def _set_result(self, result=None, error=None):
+        try:
+            if error is not None:
+                self.future.set_exception(error)
+            else:
+                self.future.set_result(result)
+        except concurrent.futures.InvalidStateError:
+            pass  # cancelled while running
+
+
+class RequestScheduler:
+    """Priority queue of blocking calls served by `max_concurrency` workers.
+
+    Calls are submitted from any thread and run in a thread pool driven by a
+    single event loop thread. At most `max_queue` requests may wait; beyond
+    that submit() raises QueueFullError so callers can push back.
+    """
+
+    def __init__(self, max_concurrency=4, max_queue=32):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._running = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="api-call")
+        import asyncio  # imported here to keep it off the startup path
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="api-scheduler", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        import asyncio
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.max_concurrency)]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _worker(self):
+        while True:
+            _, _, request = await self._queue.get()
+            with self._lock:
+                if self._pending.pop(request.id, None) is None:
+                    continue  # cancelled while queued
+                self._running[request.id] = request
+            try:
+                result = await self._loop.run_in_executor(self._executor, request._call)
+                request._set_result(result)
+            except Exception as e:
+                request._set_result(error=e)
+            finally:
+                with self._lock:
+                    self._running.pop(request.id, None)
+
+    def submit(self, func, *args, priority=INTERACTIVE):
+        with self._lock:
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError(f"{len(self._pending)} requests already waiting")
+            request = ScheduledRequest(next(self._ids), func, args, priority)
+            self._pending[request.id] = request
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (priority, request.id, request))
+        return request
+
+    def cancel(self, request_id):
+        # A queued request is dropped; a running one is abandoned and told to stop early
+        with self._lock:
+            request = self._pending.pop(request_id, None) or self._running.get(request_id)
+        if request is None:
+            return False
+        request._cancel_event.set()
+        request.future.cancel()
+        return True
+
+    def queue_depth(self):
+        with self._lock:
+            return len(self._pending)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._running)
+
+    def _stop_loop(self):
+        for task in self._workers:
+            task.cancel()
+        self._loop.call_soon(self._loop.stop)
+
+    def shutdown(self):
+        with self._lock:
+            outstanding = list(self._pending) + list(self._running)
+        for request_id in outstanding:
+            self.cancel(request_id)
+        self._loop.call_soon_threadsafe(self._stop_loop)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,142 @@
+# search_index.py
+# Inverted index over chat messages for fast prefix and phrase search
+
+import bisect
+import operator
+import re
+from itertools import repeat
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# Positions of adjacent word pairs are stored as position << ID_BITS | msg_id, so a
+# phrase is a few offset-shifted set lookups starting from its rarest pair instead of
+# a per-message scan. The id goes in the low bits because set slots come from them
+# (ints hash to themselves).
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+
+def tokenize(text):
+    # [(token, start, end)] with lowercased tokens and character offsets into text
+    return [(m.group().lower(), m.start(), m.end()) for m in TOKEN_RE.finditer(text)]
+
+
+def words(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def parse_query(query):
+    """Split a query into (prefix terms, phrases).
+
+    Bare words match any word starting with them; "quoted words" must
+    appear next to each other, in order.
+    """
+    prefixes, phrases = [], []
+    for phrase, word in QUERY_RE.findall(query):
+        if phrase:
+            tokens = words(phrase)
+            if tokens:
+                phrases.append(tokens)
+        else:
+            prefixes.extend(words(word))
+    return prefixes, phrases
+
+
+class SearchIndex:
+    def __init__(self):
+        self._postings = {}  # token -> {message ids}
+        self._pairs = {}  # "word next" -> {encoded positions of word}
+        self._vocab = []  # sorted tokens, for prefix lookups
+        self.version = 0  # bumped on every change so callers can tell results are stale
+
+    def add(self, msg_id, text):
+        tokens = words(text)
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                bisect.insort(self._vocab, token)
+            postings.add(msg_id)
+        for pos, pair in enumerate(map(" ".join, zip(tokens, tokens[1:]))):
+            positions = self._pairs.get(pair)
+            if positions is None:
+                positions = self._pairs[pair] = set()
+            positions.add(pos << ID_BITS | msg_id)
+        self.version += 1
+
+    def remove(self, msg_id, text):
+        tokens = words(text)
+        for token in set(tokens):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(msg_id)
+        for pos, pair in enumerate(map(" ".join, zip(tokens, tokens[1:]))):
+            positions = self._pairs.get(pair)
+            if positions is not None:
+                positions.discard(pos << ID_BITS | msg_id)
+        self.version += 1
+
+    def clear(self):
+        self._postings.clear()
+        self._pairs.clear()
+        self._vocab.clear()
+        self.version += 1
+
+    def _prefix_matches(self, prefix):
+        ids = set()
+        i = bisect.bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            ids.update(self._postings[self._vocab[i]])
+            i += 1
+        return ids
+
+    def _phrase_matches(self, tokens):
+        if len(tokens) == 1:
+            return set(self._postings.get(tokens[0], ()))
+        positions = [self._pairs.get(f"{a} {b}") for a, b in zip(tokens, tokens[1:])]
+        if not all(positions):
+            return set()
+        # Candidate phrase starts come from the rarest pair; every other pair
+        # (rarest first) then keeps only the starts it appears at the right offset from
+        # (map/filter keep the loops in C). Starts before a message's first word go
+        # negative and never match.
+        order = sorted(range(len(positions)), key=lambda i: len(positions[i]))
+        starts = set(map(operator.sub, positions[order[0]], repeat(order[0] << ID_BITS)))
+        for offset in order[1:]:
+            shift = offset << ID_BITS
+            found = filter(positions[offset].__contains__, map(operator.add, starts, repeat(shift)))
+            starts = set(map(operator.sub, found, repeat(shift)))
+            if not starts:
+                return set()
+        return set(map(operator.and_, starts, repeat(ID_MASK)))
+
+    def search(self, query):
+        # Sorted ids of messages matching every term and phrase of the query
+        prefixes, phrases = parse_query(query)
+        result = None
+        for prefix in sorted(prefixes, key=len, reverse=True):
+            ids = self._prefix_matches(prefix)
+            result = ids if result is None else result & ids
+            if not result:
+                return []
+        for tokens in phrases:
+            ids = self._phrase_matches(tokens)
+            result = ids if result is None else result & ids
+            if not result:
+                return []
+        return sorted(result) if result else []
+
+
+def match_spans(text, query):
+    # Character spans of every query match inside text, for highlighting
+    prefixes, phrases = parse_query(query)
+    tokens = tokenize(text)
+    spans = [(start, end) for token, start, end in tokens if any(token.startswith(p) for p in prefixes)]
+    words = [t for t, _, _ in tokens]
+    for phrase in phrases:
+        n = len(phrase)
+        for i in range(len(words) - n + 1):
+            if words[i:i + n] == phrase:
+                spans.append((tokens[i][1], tokens[i + n - 1][2]))
+    return sorted(spans)
@@ -0,0 +1,182 @@
+# semantic_cache.py
+# Near-duplicate question lookup with hashed n-gram TF-IDF vectors (needs NumPy)
+
+import re
+import threading
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # semantic lookup is disabled without NumPy
+
+AVAILABLE = np is not None
+
+# Words that turn a topic into a question without changing what is asked
+STOPWORDS = frozenset(
+    "a an the is are was were be of to in on for and or with about me my i you your it this that "
+    "what whats does do did can could would should please tell explain "
+    "describe define give show help question".split()
+)
+
+# Words that change the answer however similar the rest is ("why" vs "when"); questions
+# are only compared with others that have exactly the same ones
+QUESTION_WORDS = frozenset("how why when where which who whose whom".split())
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+# Numbers and math symbols make every token and its position matter: "2x+3=7" vs "2x-3=7",
+# "3/4 of 12" vs "4/3 of 12", "5 miles to km" vs "5 km to miles"
+MATH_RE = re.compile(r"[\d+\-*/^=×÷%<>]")
+MATH_TOKEN_RE = re.compile(r"\d+(?:\.\d+)?|[a-z]+|[+\-*/^=×÷%<>]")
+
+
+def signature(text):
+    text = text.lower()
+    if MATH_RE.search(text):
+        # Only the same sequence of numbers, operators, variables and units (stopwords aside)
+        return "|" + " ".join(t for t in MATH_TOKEN_RE.findall(text) if t not in STOPWORDS)
+    return " ".join(sorted(QUESTION_WORDS.intersection(WORD_RE.findall(text)))) + "|"
+
+
+class HashedEmbedder:
+    """Maps text to a unit vector of hashed word and character-trigram counts.
+
+    Feature weights are (1 + log tf) * idf, with document frequencies
+    accumulated from every text passed to fit().
+    """
+
+    def __init__(self, dim=128):
+        self.dim = dim
+        self.doc_freq = np.zeros(dim, dtype=np.float32)
+        self.docs = 0
+
+    def _features(self, text):
+        words = [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+        features = list(words)
+        for w in words:
+            padded = f"#{w}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def _counts(self, text):
+        counts = {}
+        for f in self._features(text):
+            slot = zlib.crc32(f.encode("utf-8")) % self.dim
+            counts[slot] = counts.get(slot, 0) + 1
+        return counts
+
+    def fit(self, text):
+        for slot in self._counts(text):
+            self.doc_freq[slot] += 1
+        self.docs += 1
+
+    def embed(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        counts = self._counts(text)
+        if not counts:
+            return vec
+        slots = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        idf = np.log((self.docs + 1) / (self.doc_freq[slots] + 1)) + 1
+        vec[slots] = (1 + np.log(tf)) * idf
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+class VectorIndex:
+    """Append-only matrix of unit vectors with brute-force cosine search.
+
+    Storage grows by doubling; once `max_entries` is reached the oldest
+    rows are overwritten.
+    """
+
+    def __init__(self, dim, max_entries=100_000, capacity=1024):
+        self.dim = dim
+        self.max_entries = max_entries
+        self.vectors = np.zeros((min(capacity, max_entries), dim), dtype=np.float32)
+        self.values = []
+        self.size = 0
+        self._next = 0  # row written next once full
+
+    def add(self, vec, value):
+        if self.size < self.max_entries:
+            if self.size == len(self.vectors):
+                grown = np.zeros((min(self.size * 2, self.max_entries), self.dim), dtype=np.float32)
+                grown[:self.size] = self.vectors
+                self.vectors = grown
+            self.vectors[self.size] = vec
+            self.values.append(value)
+            self.size += 1
+            return
+        self.vectors[self._next] = vec
+        self.values[self._next] = value
+        self._next = (self._next + 1) % self.max_entries
+
+    def extend(self, vectors, values):
+        for vec, value in zip(vectors, values):
+            self.add(vec, value)
+
+    def search(self, vec):
+        # Returns (similarity, value) of the closest row, or (0.0, None) when empty
+        if not self.size:
+            return 0.0, None
+        sims = self.vectors[:self.size] @ vec
+        best = int(np.argmax(sims))
+        return float(sims[best]), self.values[best]
+
+
+class SemanticCache:
+    """Returns a stored answer when a new question is close enough to an old one.
+
+    Questions are only compared within the same subject and signature():
+    the same question words, and for anything with numbers or math symbols
+    the same tokens in the same order, since a bag of words can't tell
+    "3/4 of 12" from "4/3 of 12" or "2x+3=7" from "2x-3=7".
+    """
+
+    def __init__(self, threshold=0.9, dim=128, max_entries=100_000):
+        if np is None:
+            raise RuntimeError("SemanticCache requires NumPy")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.embedder = HashedEmbedder(dim)
+        self._indexes = {}  # (subject, signature) -> VectorIndex
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, prompt, subject=None):
+        with self._lock:
+            index = self._indexes.get(self._partition(prompt, subject))
+            vec = self.embedder.embed(prompt)
+            similarity, response = index.search(vec) if index is not None and vec.any() else (0.0, None)
+            if response is not None and similarity >= self.threshold:
+                self.hits += 1
+                return response
+            self.misses += 1
+            return None
+
+    def add(self, prompt, subject, response):
+        with self._lock:
+            self.embedder.fit(prompt)
+            vec = self.embedder.embed(prompt)
+            if not vec.any():
+                return
+            key = self._partition(prompt, subject)
+            if key not in self._indexes:
+                self._indexes[key] = VectorIndex(self.embedder.dim, self.max_entries)
+            self._indexes[key].add(vec, response)
+
+    @staticmethod
+    def _partition(prompt, subject):
+        return (subject or "").lower(), signature(prompt)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": sum(index.size for index in self._indexes.values()),
+            }
@@ -0,0 +1,346 @@
+# server.py
+# Headless multi-user tutoring server on asyncio: JSON over HTTP, streaming over SSE or WebSocket
+#
+#   GET    /health                    server status and queue depth
+#   GET    /metrics                   latency histograms in Prometheus text format
+#   POST   /sessions                  {"name": ...} -> {"session_id": ...}
+#   POST   /sessions/<id>/ask         {"question": ..., "subject": ..., "stream": false}
+#   DELETE /sessions/<id>
+#   GET    /ws?session_id=<id>        WebSocket; send {"question", "subject"}, receive chunk/done messages
+#
+# With "stream": true, /ask answers with text/event-stream: one `data:` event per chunk,
+# then an `event: done` carrying the full response. A failure after the first chunk ends
+# the stream with an `event: error` ({"status", "error"}) instead.
+
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import time
+import uuid
+
+from metrics import metrics
+from resilience import BackendUnavailable
+from scheduler import INTERACTIVE, QueueFullError
+from user_profile import UserProfile
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_BODY = 1024 * 1024
+
+REASONS = {
+    101: "Switching Protocols",
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+_DONE = object()
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class TutorServer:
+    """Serves many students from one process.
+
+    Every session is a UserProfile; all of them share one APIClient, whose
+    scheduler bounds concurrent model calls and queue length. Sessions idle
+    for `session_ttl` seconds are dropped.
+    """
+
+    def __init__(self, api_client, archive=None, session_ttl=3600):
+        self.api = api_client
+        self.archive = archive
+        self.session_ttl = session_ttl
+        self.sessions = {}  # session id -> [UserProfile, last active time]
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_BODY)
+        asyncio.get_running_loop().create_task(self._expire_sessions())
+        return self._server
+
+    async def serve_forever(self, host="127.0.0.1", port=8765):
+        server = await self.start(host, port)
+        print(f"Tutor server listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    # === Sessions ===
+
+    def _new_session(self, name):
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = [UserProfile(name or "Guest", archive=self.archive), time.monotonic()]
+        return session_id
+
+    def _session(self, session_id):
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            raise HTTPError(404, "unknown session")
+        entry[1] = time.monotonic()
+        return entry[0]
+
+    def _end_session(self, session_id):
+        entry = self.sessions.pop(session_id, None)
+        if entry is not None:
+            entry[0].end_session()
+
+    async def _expire_sessions(self):
+        while True:
+            await asyncio.sleep(60)
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id in [sid for sid, (_, seen) in self.sessions.items() if seen < cutoff]:
+                self._end_session(session_id)
+
+    async def _ask(self, user, question, subject):
+        # Async iterator over answer chunks; the model call runs on the API client's scheduler
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        def run():
+            parts = []
+            for chunk in self.api.stream_response(question, subject, context=user.context):
+                parts.append(chunk)
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            response = "".join(parts)
+            user.add_to_history(question, response, subject)
+            return response
+
+        try:
+            request = self.api.submit(run, priority=INTERACTIVE)
+        except QueueFullError:
+            raise HTTPError(503, "server busy, try again later")
+        request.add_done_callback(lambda r: loop.call_soon_threadsafe(chunks.put_nowait, _DONE))
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is _DONE:
+                    break
+                yield chunk
+        finally:
+            if not request.future.done():
+                self.api.cancel(request.id)  # the client went away
+        if request.future.cancelled():
+            raise HTTPError(503, "request cancelled")
+        error = request.future.exception()
+        if isinstance(error, BackendUnavailable):
+            raise HTTPError(503, f"{error}; retry in {error.retry_after:.0f}s")
+        if error is not None:
+            raise HTTPError(502, f"model error: {error}")
+
+    # === HTTP ===
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    if headers.get("upgrade", "").lower() == "websocket" and path == "/ws":
+                        await self._websocket(reader, writer, headers, query)
+                        break
+                    keep_alive = await self._dispatch(writer, method, path, body) and keep_alive
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": str(e)}, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY:
+            raise ValueError("request body too large")
+        body = await reader.readexactly(length) if length else b""
+        path, _, query = target.partition("?")
+        params = dict(p.partition("=")[::2] for p in query.split("&") if p)
+        return method, path, params, headers, body
+
+    async def _send_json(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _send_text(self, writer, status, text, content_type="text/plain; charset=utf-8"):
+        body = text.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    def _json_body(self, body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "invalid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "expected a JSON object")
+        return data
+
+    async def _dispatch(self, writer, method, path, body):
+        # Returns False when the connection must close after the response
+        parts = path.strip("/").split("/")
+        if parts == ["health"] and method == "GET":
+            await self._send_json(writer, 200, {
+                "status": "ok",
+                "sessions": len(self.sessions),
+                "queue_depth": self.api.queue_depth(),
+                "in_flight": self.api.in_flight(),
+                "backend": self.api.resilience.stats(),
+            })
+        elif parts == ["metrics"] and method == "GET":
+            await self._send_text(writer, 200, metrics.to_prometheus(), "text/plain; version=0.0.4")
+        elif parts == ["sessions"] and method == "POST":
+            session_id = self._new_session(self._json_body(body).get("name"))
+            await self._send_json(writer, 200, {"session_id": session_id})
+        elif len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+            self._session(parts[1])
+            self._end_session(parts[1])
+            await self._send_json(writer, 200, {"status": "ended"})
+        elif len(parts) == 3 and parts[0] == "sessions" and parts[2] == "ask" and method == "POST":
+            user = self._session(parts[1])
+            data = self._json_body(body)
+            question = data.get("question")
+            if not isinstance(question, str) or not question.strip():
+                raise HTTPError(400, "missing question")
+            answer = self._ask(user, question, data.get("subject"))
+            if data.get("stream"):
+                await self._send_event_stream(writer, answer)
+                return False
+            response = "".join([chunk async for chunk in answer])
+            await self._send_json(writer, 200, {"response": response})
+        elif parts[0] in ("health", "metrics", "sessions"):
+            raise HTTPError(405, "method not allowed")
+        else:
+            raise HTTPError(404, "not found")
+        return True
+
+    async def _send_event_stream(self, writer, answer):
+        # Headers go out with the first chunk so a full queue can still answer 503
+        parts = []
+        try:
+            async for chunk in answer:
+                if not parts:
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                        b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+                    )
+                parts.append(chunk)
+                writer.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                await writer.drain()
+        except HTTPError as e:
+            if not parts:
+                raise  # nothing sent yet: a plain error response
+            # The stream is already open; a new status line would corrupt it
+            error = json.dumps({"status": e.status, "error": str(e)})
+            writer.write(f"event: error\ndata: {error}\n\n".encode("utf-8"))
+            await writer.drain()
+            return
+        if not parts:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+        writer.write(f"event: done\ndata: {json.dumps(''.join(parts))}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    # === WebSocket ===
+
+    async def _websocket(self, reader, writer, headers, query):
+        # Minimal RFC 6455: unfragmented text frames, ping/pong and close
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise HTTPError(400, "missing Sec-WebSocket-Key")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("latin-1")).digest()).decode("latin-1")
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+        )
+        session_id = query.get("session_id")
+        if session_id not in self.sessions:
+            session_id = self._new_session(query.get("name"))
+        await self._ws_send(writer, {"type": "session", "session_id": session_id})
+
+        while True:
+            opcode, payload = await self._ws_read(reader)
+            if opcode == 0x8:
+                writer.write(self._ws_frame(0x8, payload[:2]))
+                await writer.drain()
+                return
+            if opcode == 0x9:
+                writer.write(self._ws_frame(0xA, payload))
+                await writer.drain()
+                continue
+            if opcode != 0x1:
+                continue
+            try:
+                data = self._json_body(payload)
+                question = data.get("question")
+                if not isinstance(question, str) or not question.strip():
+                    raise HTTPError(400, "missing question")
+                parts = []
+                async for chunk in self._ask(self._session(session_id), question, data.get("subject")):
+                    parts.append(chunk)
+                    await self._ws_send(writer, {"type": "chunk", "text": chunk})
+                await self._ws_send(writer, {"type": "done", "response": "".join(parts)})
+            except HTTPError as e:
+                await self._ws_send(writer, {"type": "error", "status": e.status, "message": str(e)})
+
+    async def _ws_read(self, reader):
+        first, second = await reader.readexactly(2)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_BODY:
+            raise ValueError("frame too large")
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return opcode, payload
+
+    def _ws_frame(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        return header + payload
+
+    async def _ws_send(self, writer, message):
+        writer.write(self._ws_frame(0x1, json.dumps(message).encode("utf-8")))
+        await writer.drain()
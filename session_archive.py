@@ -0,0 +1,110 @@
+# session_archive.py
+# SQLite archive of past tutoring sessions, browsable page by page
+
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    subject TEXT,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_user_started ON sessions (user, started_at);
+CREATE INDEX IF NOT EXISTS sessions_subject_started ON sessions (subject, started_at);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started_at);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    seq INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    text TEXT NOT NULL,
+    time TEXT,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+class SessionArchive:
+    """Sessions and their messages, shared by every UserProfile of the app.
+
+    Listing is keyset-paginated, newest first, so browsing never loads more
+    than one page of sessions or messages at a time.
+    """
+
+    def __init__(self, path="sessions.db"):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def start_session(self, user, subject=None, started_at=None):
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "INSERT INTO sessions (user, subject, started_at) VALUES (?, ?, ?)",
+                (user, subject, started_at or time.time()),
+            )
+            return cur.lastrowid
+
+    def end_session(self, session_id, ended_at=None):
+        with self._lock, self._db:
+            self._db.execute("UPDATE sessions SET ended_at = ? WHERE id = ?", (ended_at or time.time(), session_id))
+
+    def add_messages(self, session_id, messages):
+        # Bulk insert of {"sender", "text", "time"} dicts in one transaction
+        with self._lock, self._db:
+            count = self._db.execute("SELECT message_count FROM sessions WHERE id = ?", (session_id,)).fetchone()[0]
+            rows = [
+                (session_id, count + i, m["sender"], m["text"], m.get("time"))
+                for i, m in enumerate(messages)
+            ]
+            self._db.executemany("INSERT INTO messages (session_id, seq, sender, text, time) VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.execute("UPDATE sessions SET message_count = ? WHERE id = ?", (count + len(rows), session_id))
+
+    def list_sessions(self, user=None, subject=None, since=None, until=None, before=None, limit=20):
+        """One page of sessions, newest first.
+
+        Pass the returned cursor as `before` to get the next (older) page;
+        the cursor is None on the last page.
+        """
+        clauses, params = [], []
+        if user is not None:
+            clauses.append("user = ?")
+            params.append(user)
+        if subject is not None:
+            clauses.append("subject = ?")
+            params.append(subject)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("started_at < ?")
+            params.append(until)
+        if before is not None:
+            clauses.append("(started_at, id) < (?, ?)")
+            params.extend(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM sessions {where} ORDER BY started_at DESC, id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+        sessions = [dict(row) for row in rows[:limit]]
+        cursor = (sessions[-1]["started_at"], sessions[-1]["id"]) if len(rows) > limit else None
+        return sessions, cursor
+
+    def get_messages(self, session_id, offset=0, limit=200):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sender, text, time FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                (session_id, offset, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
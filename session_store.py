@@ -0,0 +1,154 @@
+# session_store.py
+# Append-only JSONL journal of the chat session, written by a background thread
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+
+class SessionJournal:
+    """One JSON record per line, appended as messages arrive.
+
+    Records are written by a background thread and fsynced at most every
+    `flush_interval` seconds or `batch_size` records, so a crash loses at
+    most that much. Every `compact_every` appends the file is rewritten
+    keeping only the newest `max_records` valid records.
+    """
+
+    def __init__(self, path="last_session.jsonl", batch_size=50, flush_interval=1.0,
+                 max_records=100_000, compact_every=5000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_records = max_records
+        self.compact_every = compact_every
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="session-journal", daemon=True)
+        self._thread.start()
+
+    # === Called from the UI thread ===
+
+    def append(self, record):
+        self._queue.put(("append", record))
+
+    def extend(self, records):
+        # A batch of records, e.g. one slice of an imported transcript; written with one sync
+        self._queue.put(("extend", list(records)))
+
+    def replace(self, records):
+        # Start the journal over with `records` (e.g. after loading another conversation)
+        self._queue.put(("replace", list(records)))
+
+    def compact(self):
+        self._queue.put(("compact", None))
+
+    def close(self):
+        # Flushes everything still queued; blocks until written
+        self._queue.put(("close", None))
+        self._thread.join()
+
+    def tail(self, n):
+        """The last n valid records, read backwards from the end of the file."""
+        if n <= 0 or not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            # One extra line so a partially read first line is never used
+            while pos > 0 and data.count(b"\n") <= n:
+                step = min(64 * 1024, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.splitlines()
+        if pos > 0:
+            lines = lines[1:]
+        records = []
+        for line in reversed(lines):
+            record = self._parse(line)
+            if record is not None:
+                records.append(record)
+                if len(records) == n:
+                    break
+        records.reverse()
+        return records
+
+    # === Writer thread ===
+
+    @staticmethod
+    def _parse(line):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None  # torn write from a crash
+        return record if isinstance(record, dict) else None
+
+    def _open(self):
+        f = open(self.path, "a+b")
+        # A crash can leave a partial last line; never glue the next record onto it
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        return f
+
+    def _sync(self, f):
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _rewrite(self, records):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as out:
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            self._sync(out)
+        os.replace(tmp, self.path)
+
+    def _compacted(self):
+        kept = deque(maxlen=self.max_records)
+        with open(self.path, "rb") as f:
+            for line in f:
+                record = self._parse(line)
+                if record is not None:
+                    kept.append(record)
+        return kept
+
+    def _run(self):
+        f = self._open()
+        pending = 0
+        appended = 0
+        last_sync = time.monotonic()
+        while True:
+            try:
+                command, arg = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                command, arg = None, None
+
+            if command == "append":
+                f.write(json.dumps(arg, ensure_ascii=False).encode("utf-8") + b"\n")
+                pending += 1
+                appended += 1
+                if appended % self.compact_every == 0:
+                    command = "compact"
+            elif command == "extend":
+                f.writelines(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in arg)
+                pending += len(arg)
+
+            now = time.monotonic()
+            if pending and (command not in (None, "append") or pending >= self.batch_size
+                            or now - last_sync >= self.flush_interval):
+                self._sync(f)
+                pending = 0
+                last_sync = now
+
+            if command in ("replace", "compact"):
+                f.close()
+                self._rewrite(arg if command == "replace" else self._compacted())
+                f = self._open()
+            elif command == "close":
+                f.close()
+                return
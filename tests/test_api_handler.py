@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from api_handler import APIClient
+from context_manager import ConversationContext
+from fake_backend import FakeModel
+from response_cache import ResponseCache
+
+FOLLOW_UPS = ["Why?", "What about 3/5?", "Can you give another example?",
+              "I still don't understand the second step", "ok and the next step"]
+
+
+@pytest.fixture
+def model():
+    # The fake model answers with the whole prompt it was sent
+    return FakeModel(reply=lambda prompt: prompt, first_delay=0.1, chunk_delay=0)
+
+
+@pytest.fixture
+def api(model, tmp_path):
+    api = APIClient(None, model=model, retries=1, cache=ResponseCache(str(tmp_path / "cache.db")))
+    yield api
+    api.close()
+
+
+def student(secret):
+    context = ConversationContext()
+    context.add_turn(f"My name is {secret}", "Nice to meet you!")
+    return context
+
+
+@pytest.mark.parametrize("question", FOLLOW_UPS)
+def test_questions_in_a_conversation_are_sent_with_it(api, question):
+    assert "Alice" in api.get_response(question, "Math", context=student("Alice"))
+    assert "Bob" in "".join(api.stream_response(question, "Math", context=student("Bob")))
+
+
+def test_first_question_is_cached_and_shared(api, model):
+    question = "What does it mean for a number to be prime?"
+    first = api.get_response(question, "Math", context=ConversationContext())
+    assert api.get_response(question, "Math", context=ConversationContext()) == first
+    assert "".join(api.stream_response(question, "Math")) == first
+    assert model.calls == 1
+
+
+def test_answers_in_a_conversation_are_not_shared(api, model):
+    question = "What is photosynthesis?"
+    assert "Alice" in api.get_response(question, "Science", context=student("Alice"))
+    assert "Bob" in api.get_response(question, "Science", context=student("Bob"))
+    assert "Alice" not in api.get_response(question, "Science")
+    assert api.cached_response(question, "Science", context=student("Carol")) is None
+    assert model.calls == 3
+
+
+def test_only_identical_prompts_are_coalesced(api, model):
+    answers = {}
+
+    def ask(name, context):
+        answers[name] = api.get_response("Why?", "Science", context=context)
+
+    alice = student("Alice")
+    threads = [threading.Thread(target=ask, args=(name, context))
+               for name, context in (("alice", alice), ("alice again", alice), ("bob", student("Bob")))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert "Alice" in answers["alice"] and answers["alice again"] == answers["alice"]
+    assert "Bob" in answers["bob"] and "Alice" not in answers["bob"]
+    assert model.calls == 2
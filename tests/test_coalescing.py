@@ -0,0 +1,111 @@
+import threading
+import time
+
+from coalescing import SingleFlight
+
+
+def slow_chunks():
+    for chunk in ("a", "b", "c"):
+        time.sleep(0.05)
+        yield chunk
+
+
+def start(target):
+    result = {}
+
+    def run():
+        try:
+            result["value"] = target()
+        except Exception as e:
+            result["error"] = e
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    time.sleep(0.02)  # let it become the leader
+    return thread, result
+
+
+def test_blocking_follower_of_streaming_leader():
+    flight = SingleFlight()
+    thread, leader = start(lambda: "".join(flight.stream("k", slow_chunks)))
+    follower_thread, follower = start(lambda: flight.do("k", lambda: "called upstream"))
+    follower_thread.join(2)
+    assert not follower_thread.is_alive(), "blocking follower never woke up"
+    assert follower["value"] == "abc"
+    thread.join(1)
+    assert leader["value"] == "abc"
+    assert (flight.upstream, flight.shared) == (1, 1)
+
+
+def test_streaming_follower_of_blocking_leader():
+    flight = SingleFlight()
+    thread, leader = start(lambda: flight.do("k", lambda: (time.sleep(0.1), "answer")[1]))
+    follower_thread, follower = start(lambda: list(flight.stream("k", slow_chunks)))
+    follower_thread.join(2)
+    assert not follower_thread.is_alive(), "streaming follower never finished"
+    assert follower["value"] == ["answer"]
+    thread.join(1)
+    assert leader["value"] == "answer"
+
+
+def test_followers_see_the_leaders_error():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("upstream failed")
+    thread, leader = start(lambda: flight.do("k", failing))
+    follower_thread, follower = start(lambda: list(flight.stream("k", slow_chunks)))
+    follower_thread.join(2)
+    assert not follower_thread.is_alive(), "streaming follower never finished"
+    assert isinstance(follower["error"], ValueError)
+    thread.join(1)
+    assert isinstance(leader["error"], ValueError)
+
+
+def test_streaming_followers_replay_earlier_chunks():
+    flight = SingleFlight()
+    thread, leader = start(lambda: list(flight.stream("k", slow_chunks)))
+    time.sleep(0.06)
+    assert list(flight.stream("k", slow_chunks)) == ["a", "b", "c"]
+    thread.join(1)
+
+
+def test_follower_gets_the_answer_when_the_leader_cancels():
+    flight = SingleFlight()
+    closed = []
+
+    def upstream():
+        try:
+            yield from slow_chunks()
+        finally:
+            closed.append(True)
+
+    leader_chunks = flight.stream("k", upstream)
+    assert next(leader_chunks) == "a"
+    follower_thread, follower = start(lambda: list(flight.stream("k", upstream)))
+    leader_chunks.close()  # student A cancels
+    follower_thread.join(2)
+    assert not follower_thread.is_alive(), "streaming follower never finished"
+    assert follower["value"] == ["a", "b", "c"]
+    assert closed == [True]  # upstream ran to the end, once
+    blocking_thread, blocking = start(lambda: flight.do("k", lambda: "called upstream"))
+    blocking_thread.join(1)
+    assert blocking["value"] == "called upstream"  # the finished call is not joined any more
+    assert flight.upstream == 2
+
+
+def test_cancelled_leader_without_followers_stops_upstream():
+    flight = SingleFlight()
+    closed = []
+
+    def upstream():
+        try:
+            yield from slow_chunks()
+        finally:
+            closed.append(True)
+
+    chunks = flight.stream("k", upstream)
+    next(chunks)
+    chunks.close()
+    assert closed == [True]
+    assert flight.do("k", lambda: "fresh") == "fresh"
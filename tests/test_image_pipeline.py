@@ -0,0 +1,79 @@
+import io
+import random
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image
+
+from image_pipeline import EXIF_ORIENTATION, ImagePipeline, process_image, sniff_mime
+
+
+def noisy(size, mode="RGB"):
+    # Random pixels, so every encoding has real work to do
+    rng = random.Random(0)
+    image = Image.new(mode, size)
+    image.putdata([tuple(rng.randrange(256) for _ in mode) for _ in range(size[0] * size[1])])
+    return image
+
+
+def encode(image, fmt, **options):
+    out = io.BytesIO()
+    image.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def test_large_images_are_downscaled():
+    data = encode(noisy((800, 200)), "JPEG", quality=95)
+    result = process_image(data, max_side=400)
+    assert (result.width, result.height) == (400, 100)
+    assert result.mime_type == "image/jpeg"
+    assert Image.open(io.BytesIO(result.data)).size == (400, 100)
+    assert result.saved > 0
+
+
+def test_uncompressed_images_are_reencoded_smaller():
+    data = encode(noisy((120, 80)), "BMP")
+    result = process_image(data)
+    assert result.mime_type == "image/jpeg"
+    assert len(result.data) < len(data)
+
+
+def test_original_is_kept_when_reencoding_is_bigger():
+    data = encode(Image.new("RGB", (8, 8), "white"), "PNG", optimize=True)
+    result = process_image(data)
+    assert result.data == data
+    assert result.mime_type == "image/png"
+    assert result.saved == 0
+
+
+def test_transparency_stays_png():
+    result = process_image(encode(noisy((600, 300), "RGBA"), "PNG"), max_side=300)
+    assert result.mime_type == "image/png"
+    assert Image.open(io.BytesIO(result.data)).mode == "RGBA"
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6  # stored sideways, shown rotated 90 degrees
+    data = encode(Image.new("RGB", (40, 20), "white"), "JPEG", exif=exif)
+    result = process_image(data)
+    assert (result.width, result.height) == (20, 40)
+    assert Image.open(io.BytesIO(result.data)).size == (20, 40)
+
+
+def test_undecodable_data_is_rejected():
+    with pytest.raises(ValueError, match="Unreadable image"):
+        process_image(b"not an image at all")
+    assert sniff_mime(b"not an image at all") == "application/octet-stream"
+
+
+def test_identical_uploads_are_processed_once():
+    pipeline = ImagePipeline(memo_size=1)
+    first, second = encode(noisy((30, 30)), "BMP"), encode(noisy((31, 30)), "BMP")
+    assert pipeline.process(first) is pipeline.process(first)
+    assert (pipeline.processed, pipeline.deduped) == (1, 1)
+    pipeline.process(second)
+    pipeline.process(first)  # pushed out of the one-entry memo
+    assert (pipeline.processed, pipeline.deduped) == (3, 1)
@@ -0,0 +1,78 @@
+import pytest
+
+from message_store import MessageStore, format_time
+
+# Multi-byte text, so offsets in the spill file are bytes, not characters
+TEXTS = [f"message {i} {'é' * (i % 5)}" for i in range(50)]
+
+
+def filled(texts=TEXTS, **kwargs):
+    store = MessageStore(**kwargs)
+    for i, text in enumerate(texts):
+        store.append("You" if i % 2 else "Bot", text, timestamp=1000.0 + i)
+    return store
+
+
+@pytest.fixture(params=[None, "spill.bin"], ids=["tempfile", "spill_path"])
+def store(request, tmp_path):
+    spill_path = str(tmp_path / request.param) if request.param else None
+    store = filled(max_in_memory=8, spill_path=spill_path)
+    yield store
+    store.close()
+
+
+def test_spills_the_oldest_texts(store):
+    stats = store.memory_stats()
+    assert stats["messages"] == 50
+    assert stats["spilled"] > 0 and stats["in_memory"] <= 8
+    assert stats["senders"] == 2
+
+
+def test_reads_back_every_message(store):
+    assert [store.text(i) for i in range(50)] == TEXTS
+    assert [msg.text for msg in store] == TEXTS
+    assert store[-1].sender == "You" and store[0].timestamp == 1000.0
+
+
+def test_slices_across_the_spill_boundary(store):
+    boundary = store.memory_stats()["spilled"]
+    for start, end in ((0, boundary), (boundary - 10, boundary - 4), (boundary - 3, boundary + 3), (boundary, 50), (0, 50), (5, 6)):
+        assert store.texts(start, end) == TEXTS[start:end], (start, end)
+        assert [msg.text for msg in store[start:end]] == TEXTS[start:end]
+        assert [msg.index for msg in store[start:end]] == list(range(start, end))
+    assert store.texts(45, 100) == TEXTS[45:]
+    assert store.texts(10, 10) == []
+
+
+def test_iter_messages_in_batches(store):
+    assert [msg.text for msg in store.iter_messages(3, 47, batch=7)] == TEXTS[3:47]
+
+
+def test_clear_after_a_spill(store):
+    generation = store.generation
+    store.clear()
+    assert len(store) == 0 and store.generation == generation + 1
+    assert store.memory_stats()["spilled"] == 0
+    texts = [f"new {i}" for i in range(20)]
+    for text in texts:
+        store.append("Bot", text)
+    assert store.memory_stats()["spilled"] > 0
+    assert store.texts(0, 20) == texts
+
+
+def test_extend_and_replace_take_dicts():
+    store = MessageStore()
+    store.extend([{"sender": "You", "text": "hi", "time": "10:00:00"}, {"sender": "Bot", "text": "hello"}])
+    assert format_time(store.timestamp(0)) == "10:00:00"
+    assert store.timestamp(1) != store.timestamp(1)  # NO_TIME is NaN
+    store.replace([{"sender": "Bot", "text": "only", "time": 5.0}])
+    assert [msg.to_dict()["text"] for msg in store] == ["only"]
+    assert store.generation == 1
+
+
+def test_slices_must_be_contiguous():
+    store = filled()
+    with pytest.raises(ValueError):
+        store[::2]
+    with pytest.raises(IndexError):
+        store[50]
@@ -0,0 +1,91 @@
+import json
+import re
+
+import pytest
+
+from metrics import BUCKETS, Histogram, Metrics
+
+BUCKET_RE = re.compile(r'^tutorbot_api_upstream_seconds_bucket\{le="([^"]+)"\} (\d+)$')
+
+
+def test_values_land_in_the_bucket_with_the_next_bound():
+    h = Histogram()
+    h.observe(BUCKETS[3])  # a bound belongs to its own bucket (le is inclusive)
+    h.observe(BUCKETS[3] * 1.01)
+    h.observe(0.0)
+    h.observe(BUCKETS[-1] * 10)  # past the last bound
+    assert h.counts[3] == 1 and h.counts[4] == 1 and h.counts[0] == 1 and h.counts[-1] == 1
+    assert h.count == 4 and h.max == BUCKETS[-1] * 10
+
+
+@pytest.mark.parametrize("q", [0.5, 0.95, 0.99])
+def test_quantiles_are_within_a_bucket(q):
+    h = Histogram()
+    values = [0.001 * (i + 1) for i in range(1000)]  # 1ms .. 1s
+    for v in values:
+        h.observe(v)
+    exact = values[int(q * len(values)) - 1]
+    assert exact / 1.26 <= h.quantile(q) <= exact * 1.26
+
+
+def test_quantile_of_empty_histogram_and_single_value():
+    h = Histogram()
+    assert h.quantile(0.5) == 0.0
+    h.observe(0.2)
+    assert h.quantile(0.99) <= 0.2
+
+
+def test_summary_timers_and_counters():
+    m = Metrics()
+    with m.timer("ui.render", "50 messages"):
+        pass
+    m.observe("api.upstream", 0.5)
+    m.observe("api.upstream", 1.5)
+    m.increment("cache.hits")
+    m.increment("cache.hits", 2)
+    summary = m.summary()
+    assert list(summary) == ["api.upstream", "ui.render"]
+    assert summary["api.upstream"]["count"] == 2 and summary["api.upstream"]["mean"] == 1.0
+    assert summary["api.upstream"]["max"] == 1.5
+    assert m.counters() == {"cache.hits": 3}
+    assert m.slowest(1)[0][1:3] == ("api.upstream", "")
+    m.enabled = False
+    m.observe("api.upstream", 9.0)
+    assert m.summary()["api.upstream"]["count"] == 2
+
+
+def test_prometheus_lists_every_cumulative_bucket():
+    m = Metrics()
+    for seconds in (0.01, 0.01, 0.3):
+        m.observe("api.upstream", seconds)
+    m.increment("prefetch.tokens", 42)
+    lines = m.to_prometheus().splitlines()
+    assert "# TYPE tutorbot_api_upstream_seconds histogram" in lines
+    buckets = [BUCKET_RE.match(line).groups() for line in lines if BUCKET_RE.match(line)]
+    assert len(buckets) == len(BUCKETS) + 1
+    bounds = [le for le, _ in buckets]
+    assert bounds[-1] == "+Inf" and len(set(bounds)) == len(bounds)
+    assert [float(le) for le in bounds[:-1]] == sorted(float(le) for le in bounds[:-1])
+    counts = [int(n) for _, n in buckets]
+    assert counts == sorted(counts) and counts[0] == 0 and counts[-1] == 3
+    assert counts[bounds.index(next(le for le in bounds if float(le) >= 0.01))] == 2
+    assert "tutorbot_api_upstream_seconds_count 3" in lines
+    assert "tutorbot_api_upstream_seconds_sum 0.320000" in lines
+    assert "# TYPE tutorbot_prefetch_tokens_total counter" in lines
+    assert "tutorbot_prefetch_tokens_total 42" in lines
+
+
+def test_export_writes_prometheus_or_appends_jsonl(tmp_path):
+    m = Metrics()
+    m.observe("ui.answer", 0.25)
+    m.increment("prefetch.hits")
+    prom = tmp_path / "metrics.prom"
+    m.export(str(prom))
+    assert prom.read_text(encoding="utf-8") == m.to_prometheus()
+    jsonl = tmp_path / "metrics.jsonl"
+    m.export(str(jsonl))
+    m.export(str(jsonl))
+    snapshots = [json.loads(line) for line in jsonl.read_text(encoding="utf-8").splitlines()]
+    assert len(snapshots) == 2
+    assert snapshots[0]["metrics"]["ui.answer"]["count"] == 1
+    assert snapshots[0]["counters"] == {"prefetch.hits": 1}
@@ -0,0 +1,40 @@
+import time
+
+from api_handler import APIClient
+from fake_backend import FakeModel
+from prefetch import Prefetcher
+
+
+def settle(prefetcher):
+    deadline = time.monotonic() + 2
+    while prefetcher.stats()["running"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_prefetched_answer_is_taken():
+    api = APIClient(None, model=FakeModel(first_delay=0, chunk_delay=0))
+    prefetcher = Prefetcher(api)
+    try:
+        prefetcher.prefetch([("How do plants grow?", "Science")])
+        settle(prefetcher)
+        assert "How do plants grow?" in prefetcher.take("How do plants grow?", "Science")
+        assert prefetcher.stats()["hits"] == 1
+    finally:
+        api.close()
+
+
+def test_speculation_stops_when_the_budget_is_spent():
+    model = FakeModel(first_delay=0, chunk_delay=0)
+    api = APIClient(None, model=model)
+    prefetcher = Prefetcher(api, token_budget=5)
+    try:
+        prefetcher.prefetch([("How do plants grow?", "Science"), ("What is gravity?", "Science")])
+        settle(prefetcher)
+        stats = prefetcher.stats()
+        assert stats["exhausted"]
+        assert stats["requests"] == model.calls == 1
+        prefetcher.prefetch([("What is an atom?", "Science")])
+        settle(prefetcher)
+        assert model.calls == 1
+    finally:
+        api.close()
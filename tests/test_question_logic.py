@@ -0,0 +1,44 @@
+import pytest
+
+from question_logic import QuestionRouter
+
+
+@pytest.mark.parametrize("text, answer", [
+    ("what is 12 * 7 + 3", "12 * 7 + 3 = 87"),
+    ("3 x 4", "3 x 4 = 12"),
+    ("what is 3x4?", "3x4 = 12"),
+    ("2^10", "2^10 = 1024"),
+    ("7 / 2", "7 / 2 = 3.5"),
+])
+def test_arithmetic_is_answered_locally(text, answer):
+    route = QuestionRouter().route(text)
+    assert (route.kind, route.answer) == ("arithmetic", answer)
+
+
+@pytest.mark.parametrize("text", ["solve 2x-3", "what is 3x-6?", "2x(3+1)", "solve 2x + 3 = 7", "x+1"])
+def test_algebra_goes_to_the_model(text):
+    assert QuestionRouter().route(text).answer is None
+
+
+def test_division_by_zero():
+    assert "undefined" in QuestionRouter().route("5 / 0").answer
+
+
+def test_result_too_long_to_print_goes_to_the_model():
+    route = QuestionRouter().route("*".join(["99**99"] * 28))
+    assert route.answer is None and route.kind == "remote"
+
+
+@pytest.mark.parametrize("text", ["what is (((9^99)^99)^99)^99", "2^100^100", "(99^99)*(99^99)*(99^99)*(99^99)*(99^99)*(99^99)*(99^99)"])
+def test_huge_results_are_not_computed(text):
+    route = QuestionRouter().route(text)
+    assert route.answer is None and route.kind == "remote"
+
+
+@pytest.mark.parametrize("text", ["(-8)^(1/3)", "what is (-1)^0.5"])
+def test_complex_results_go_to_the_model(text):
+    assert QuestionRouter().route(text).answer is None
+
+
+def test_large_but_cheap_results_are_still_answered():
+    assert QuestionRouter().route("2^100").answer == "2^100 = 1267650600228229401496703205376"
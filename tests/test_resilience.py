@@ -0,0 +1,194 @@
+import time
+
+import pytest
+
+from backends import ModelBackend
+from fake_backend import FakeModel
+from resilience import (BackendError, BackendUnavailable, CircuitBreaker, RateLimited, ResilientCaller,
+                        TokenBucket)
+
+
+def fast_model(**faults):
+    return FakeModel(first_delay=0.001, chunk_delay=0, **faults)
+
+
+def caller(**kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    return ResilientCaller(**kwargs)
+
+
+def ask(resilience, model):
+    backend = ModelBackend(model)
+    return resilience.call(lambda timeout: backend.generate("What is a fraction?", timeout))
+
+
+def ask_streamed(resilience, model):
+    backend = ModelBackend(model)
+    return resilience.stream(lambda timeout: backend.stream("What is a fraction?", timeout))
+
+
+# === Retries and timeouts ===
+
+def test_transient_errors_are_retried():
+    model = fast_model(error_rate=0.3, seed=4)
+    resilience = caller(attempts=10)
+    for _ in range(20):
+        assert ask(resilience, model).startswith("Here is some help")
+    assert model.errors > 0
+    assert resilience.retries == model.errors
+    assert model.calls == 20 + model.errors
+    assert resilience.failures == 0
+
+
+def test_gives_up_after_the_last_attempt():
+    model = fast_model(error_rate=1.0)
+    resilience = caller(attempts=3)
+    with pytest.raises(BackendError, match="ServiceUnavailable"):
+        ask(resilience, model)
+    assert model.calls == 3
+    assert resilience.retries == 2
+    assert resilience.failures == 1
+
+
+def test_errors_that_are_not_transient_are_not_retried():
+    resilience = caller(attempts=3)
+    calls = []
+
+    def bad_request(timeout):
+        calls.append(timeout)
+        raise ValueError("400 bad request")
+
+    with pytest.raises(BackendError, match="ValueError"):
+        resilience.call(bad_request)
+    assert len(calls) == 1
+    assert resilience.breaker.state == "closed"
+
+
+def test_hung_calls_time_out():
+    model = fast_model(hang_rate=1.0)
+    resilience = caller(timeout=0.05, attempts=2)
+    start = time.perf_counter()
+    with pytest.raises(BackendError, match="TimeoutError"):
+        ask(resilience, model)
+    assert time.perf_counter() - start < 1.0
+    assert model.calls == 2
+
+
+def test_stream_is_not_retried_once_started():
+    resilience = caller(attempts=3)
+    calls = []
+
+    def fails_mid_answer(timeout):
+        calls.append(timeout)
+        yield "The first part"
+        raise ConnectionError("connection reset")
+
+    chunks = []
+    with pytest.raises(BackendError):
+        for chunk in resilience.stream(fails_mid_answer):
+            chunks.append(chunk)
+    assert chunks == ["The first part"]
+    assert len(calls) == 1
+
+
+# === Circuit breaker ===
+
+def open_circuit(model, reset_timeout=0.1):
+    resilience = caller(attempts=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout))
+    model.outage(60)
+    for _ in range(2):
+        with pytest.raises(BackendError):
+            ask(resilience, model)
+    model.outage(0)
+    return resilience
+
+
+def test_breaker_opens_and_fails_fast():
+    model = fast_model()
+    resilience = open_circuit(model, reset_timeout=60)
+    assert resilience.breaker.state == "open"
+    assert resilience.breaker.trips == 1
+    calls = model.calls
+    with pytest.raises(BackendUnavailable) as error:
+        ask(resilience, model)
+    assert error.value.retry_after > 1
+    assert model.calls == calls
+
+
+def test_successful_trial_closes_the_circuit():
+    model = fast_model()
+    resilience = open_circuit(model)
+    time.sleep(0.15)
+    assert ask(resilience, model)
+    assert resilience.breaker.state == "closed"
+    assert resilience.breaker.failures == 0
+
+
+def test_failed_trial_reopens_the_circuit():
+    model = fast_model()
+    resilience = open_circuit(model)
+    time.sleep(0.15)
+    model.outage(60)
+    with pytest.raises(BackendError):
+        ask(resilience, model)
+    assert resilience.breaker.state == "open"
+    assert resilience.breaker.trips == 2
+    with pytest.raises(BackendUnavailable):
+        ask(resilience, model)
+
+
+def test_only_one_trial_while_half_open():
+    model = fast_model()
+    resilience = open_circuit(model)
+    time.sleep(0.15)
+    chunks = ask_streamed(resilience, model)
+    next(chunks)
+    assert resilience.breaker.state == "half-open"
+    with pytest.raises(BackendUnavailable):
+        ask(resilience, model)
+    assert "".join(chunks)
+    assert resilience.breaker.state == "closed"
+
+
+def test_abandoned_streamed_trial_releases_the_circuit():
+    # A student cancelling the trial answer must not leave the circuit half-open for good
+    model = fast_model()
+    resilience = open_circuit(model)
+    time.sleep(0.15)
+    chunks = ask_streamed(resilience, model)
+    next(chunks)
+    chunks.close()
+    assert resilience.breaker.state == "open"
+    assert ask(resilience, model)  # the next caller is the new trial
+    assert resilience.breaker.state == "closed"
+
+
+# === Rate limiting ===
+
+def test_token_bucket_allows_a_burst_then_waits():
+    bucket = TokenBucket(rate=20, burst=2)
+    start = time.perf_counter()
+    bucket.acquire()
+    bucket.acquire()
+    assert time.perf_counter() - start < 0.02
+    bucket.acquire()
+    assert time.perf_counter() - start >= 0.04
+
+
+def test_token_bucket_refuses_long_waits():
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.acquire()
+    with pytest.raises(RateLimited):
+        bucket.acquire(max_wait=0.1)
+    # The refused reservation was given back, so the wait did not grow
+    assert bucket._reserve() <= 1.0
+
+
+def test_rate_limited_calls_are_spaced_out():
+    model = fast_model()
+    resilience = caller(limiter=TokenBucket(rate=20, burst=1))
+    start = time.perf_counter()
+    for _ in range(4):
+        ask(resilience, model)
+    assert time.perf_counter() - start >= 0.14
+    assert model.calls == 4
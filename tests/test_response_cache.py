@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from response_cache import ResponseCache, make_key
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+def on_disk(path, key):
+    # What a fresh process would find, ignoring this process's memory tier
+    cache = ResponseCache(path)
+    try:
+        return cache.get(key)
+    finally:
+        cache.close()
+
+
+def test_key_ignores_case_spacing_and_trailing_punctuation():
+    assert make_key("What is  a Fraction?", "Math") == make_key("what is a fraction", "math")
+    assert make_key("What is a fraction", "Math") != make_key("What is a fraction", "Science")
+    assert make_key("What is this?", "Math", b"png") != make_key("What is this?", "Math", b"jpg")
+
+
+def test_hits_and_misses_are_counted(path):
+    cache = ResponseCache(path)
+    assert cache.get("k") is None
+    cache.put("k", "answer")
+    assert cache.get("k") == "answer"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["memory_hits"], stats["disk_hits"]) == (1, 1, 1, 0)
+    assert stats["hit_rate"] == 0.5
+    cache.close()
+
+
+def test_answers_persist_and_are_promoted_to_memory(path):
+    cache = ResponseCache(path)
+    cache.put("k", "answer")
+    cache.close()
+    cache = ResponseCache(path)
+    assert cache.get("k") == "answer"
+    assert cache.get("k") == "answer"
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["memory_entries"]) == (1, 1, 1)
+    cache.close()
+
+
+def test_entries_expire(path):
+    cache = ResponseCache(path, ttl=0.05)
+    cache.put("k", "answer")
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    assert on_disk(path, "k") is None
+    cache.close()
+
+
+def test_memory_tier_is_an_lru(path):
+    cache = ResponseCache(path, memory_size=2)
+    for key in "abc":
+        cache.put(key, key.upper())
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get("a") == "A"
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+
+def fill(cache, answers):
+    for key, response in answers:
+        cache.put(key, response)
+        time.sleep(0.002)  # distinct access times
+
+
+def test_least_recently_used_rows_are_evicted(path):
+    cache = ResponseCache(path, max_entries=2)
+    cache.EVICT_EVERY = 1
+    fill(cache, [("a", "A"), ("b", "B")])
+    assert cache.get("a") == "A"  # a memory hit still counts as a use
+    time.sleep(0.002)
+    fill(cache, [("c", "C")])
+    assert [on_disk(path, key) for key in "abc"] == ["A", None, "C"]
+    cache.close()
+
+
+def test_eviction_by_size_counts_utf8_bytes(path):
+    cache = ResponseCache(path, max_bytes=25)
+    cache.EVICT_EVERY = 1
+    fill(cache, [("a", "é" * 5), ("b", "é" * 5), ("c", "é" * 5)])  # 10 bytes each
+    assert [on_disk(path, key) for key in "abc"] == [None, "é" * 5, "é" * 5]
+    cache.close()
@@ -0,0 +1,38 @@
+import random
+
+from search_index import SearchIndex, words
+
+VOCAB = "light energy plant the cell of a".split()
+
+
+def brute_force(messages, phrase):
+    n = len(phrase)
+    return [i for i, text in enumerate(messages)
+            if any(words(text)[j:j + n] == phrase for j in range(len(words(text)) - n + 1))]
+
+
+def test_phrases_match_a_linear_scan():
+    rng = random.Random(0)
+    messages = [" ".join(rng.choices(VOCAB, k=rng.randint(1, 12))) for _ in range(2000)]
+    index = SearchIndex()
+    for i, text in enumerate(messages):
+        index.add(i, text)
+    for phrase in (["light", "energy"], ["the", "cell", "of"], ["a", "a", "a"], ["plant"], ["energy", "light", "the", "cell"]):
+        assert index.search('"' + " ".join(phrase) + '"') == brute_force(messages, phrase), phrase
+
+
+def test_phrase_does_not_span_messages():
+    index = SearchIndex()
+    index.add(0, "green light")
+    index.add(1, "energy drink")
+    assert index.search('"light energy"') == []
+
+
+def test_remove_and_prefix():
+    index = SearchIndex()
+    index.add(0, "light energy")
+    index.add(1, "lightning energy")
+    assert index.search("light") == [0, 1]
+    index.remove(0, "light energy")
+    assert index.search('"light energy"') == []
+    assert index.search("light energy") == [1]
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from semantic_cache import SemanticCache, signature
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticCache()
+    cache.add("Why did the Roman empire fall?", "History", "why answer")
+    cache.add("What is 3/4 of 12", "Math", "9")
+    return cache
+
+
+def test_paraphrase_hits(cache):
+    assert cache.lookup("why did the roman empire fall", "History") == "why answer"
+    assert cache.lookup("what is 3/4 of 12?", "Math") == "9"
+
+
+def test_different_question_word_misses(cache):
+    assert cache.lookup("When did the Roman empire fall?", "History") is None
+
+
+def test_reordered_numbers_miss(cache):
+    assert cache.lookup("What is 4/3 of 12", "Math") is None
+
+
+def test_other_subject_misses(cache):
+    assert cache.lookup("What is 3/4 of 12", "Science") is None
+
+
+def test_signature_keeps_number_order():
+    assert signature("What is 3/4 of 12") != signature("What is 4/3 of 12")
+    assert signature("How do plants grow") == signature("how DO plants grow?")
+
+
+@pytest.mark.parametrize("cached, asked, subject", [
+    ("Solve 2x+3=7", "Solve 2x-3=7", "Math"),
+    ("What is 2+3", "what is 2-3", "Math"),
+    ("What is 2+3", "what is 2*3", "Math"),
+    ("convert 5 miles to km", "convert 5 km to miles", "Math"),
+    ("What is 10% of 50", "What is 10 of 50", "Math"),
+])
+def test_different_math_misses(cached, asked, subject):
+    cache = SemanticCache()
+    cache.add(cached, subject, "cached answer")
+    assert cache.lookup(cached.lower() + "?", subject) == "cached answer"
+    assert cache.lookup(asked, subject) is None
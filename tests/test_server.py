@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+from api_handler import APIClient
+from backends import Backend
+from fake_backend import FakeModel
+from server import TutorServer
+
+
+class FailsMidAnswer(Backend):
+    # Sends one chunk, then fails with an error that is not retried
+    name = "fails-mid-answer"
+
+    def stream(self, contents, timeout=None):
+        yield "The first part"
+        raise ValueError("backend fell over")
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload or {}).encode("utf-8")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, rest = data.decode("utf-8").partition("\r\n\r\n")
+    return head, rest
+
+
+def ask(model, stream):
+    async def run():
+        api = APIClient(None, model=model, retries=1)
+        server = TutorServer(api)
+        await server.start(port=0)
+        try:
+            _, body = await request(server.port(), "POST", "/sessions", {"name": "Ada"})
+            session_id = json.loads(body)["session_id"]
+            return await request(server.port(), "POST", f"/sessions/{session_id}/ask",
+                                 {"question": "What is a thesis statement?", "stream": stream})
+        finally:
+            api.close()
+    return asyncio.run(run())
+
+
+def test_stream_failure_after_first_chunk_ends_with_error_event():
+    head, body = ask(FailsMidAnswer(), stream=True)
+    assert head.startswith("HTTP/1.1 200")
+    assert "HTTP/1.1" not in body  # no second status line inside the stream
+    events = body.strip().split("\n\n")
+    assert events[0] == 'data: "The first part"'
+    assert events[-1].startswith("event: error\ndata: ")
+    error = json.loads(events[-1].split("data: ", 1)[1])
+    assert error["status"] == 502 and "backend fell over" in error["error"]
+
+
+def test_stream_failure_before_first_chunk_is_a_plain_error():
+    head, body = ask(FakeModel(error_rate=1.0, first_delay=0), stream=True)
+    assert head.startswith("HTTP/1.1 50")
+    assert "error" in json.loads(body)
+
+
+def test_streamed_answer_ends_with_done():
+    head, body = ask(FakeModel(first_delay=0, chunk_delay=0), stream=True)
+    assert head.startswith("HTTP/1.1 200")
+    assert body.strip().split("\n\n")[-1].startswith("event: done")
@@ -0,0 +1,70 @@
+import pytest
+
+from session_archive import SessionArchive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = SessionArchive(str(tmp_path / "sessions.db"))
+    yield archive
+    archive.close()
+
+
+def all_pages(archive, **filters):
+    pages, before = [], None
+    while True:
+        sessions, before = archive.list_sessions(before=before, **filters)
+        pages.append([s["id"] for s in sessions])
+        if before is None:
+            return pages
+
+
+def test_pages_are_newest_first_without_gaps_or_repeats(archive):
+    ids = [archive.start_session("ana", "Math", started_at=1000.0 + i) for i in range(7)]
+    pages = all_pages(archive, limit=3)
+    assert pages == [ids[6:3:-1], ids[3:0:-1], ids[:1]]
+
+
+def test_last_page_exactly_full_has_no_cursor(archive):
+    for i in range(6):
+        archive.start_session("ana", started_at=1000.0 + i)
+    sessions, cursor = archive.list_sessions(limit=6)
+    assert len(sessions) == 6 and cursor is None
+    assert all_pages(archive, limit=3)[-1] != []
+
+
+def test_ties_on_start_time_are_broken_by_id(archive):
+    # Sessions started in the same instant, straddling page boundaries
+    ids = [archive.start_session("ana", started_at=1000.0) for _ in range(5)]
+    ids.append(archive.start_session("ana", started_at=999.0))
+    pages = all_pages(archive, limit=2)
+    assert [i for page in pages for i in page] == ids[4::-1] + [ids[5]]
+
+
+def test_filters_by_user_subject_and_date(archive):
+    archive.start_session("ana", "Math", started_at=100.0)
+    science = archive.start_session("ana", "Science", started_at=200.0)
+    archive.start_session("ben", "Science", started_at=300.0)
+    late = archive.start_session("ana", "Science", started_at=400.0)
+
+    def ids(**filters):
+        return [s["id"] for s in archive.list_sessions(**filters)[0]]
+    assert ids(user="ana", subject="Science") == [late, science]
+    assert ids(user="ana", subject="Science", since=200.0, until=400.0) == [science]
+    assert ids(since=400.0) == [late]
+    assert ids(subject="History") == []
+
+    sessions, cursor = archive.list_sessions(user="ana", subject="Science", limit=1)
+    assert [s["id"] for s in sessions] == [late]
+    assert [s["id"] for s in archive.list_sessions(user="ana", subject="Science", before=cursor)[0]] == [science]
+
+
+def test_messages_are_numbered_across_batches(archive):
+    session = archive.start_session("ana", "Math")
+    archive.add_messages(session, [{"sender": "You", "text": f"q{i}", "time": "10:00:00"} for i in range(3)])
+    archive.add_messages(session, [{"sender": "Bot", "text": "a"}])
+    archive.end_session(session, ended_at=5.0)
+    sessions, _ = archive.list_sessions(user="ana")
+    assert sessions[0]["message_count"] == 4 and sessions[0]["ended_at"] == 5.0
+    assert [m["text"] for m in archive.get_messages(session)] == ["q0", "q1", "q2", "a"]
+    assert archive.get_messages(session, offset=2, limit=1) == [{"sender": "You", "text": "q2", "time": "10:00:00"}]
@@ -0,0 +1,13 @@
+from session_store import SessionJournal
+
+
+def test_extend_appends_batches_after_replace(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = SessionJournal(path)
+    journal.append({"text": "before the import"})
+    journal.replace([{"text": "0"}, {"text": "1"}])
+    journal.extend([{"text": "2"}, {"text": "3"}])
+    journal.extend([])
+    journal.append({"text": "4"})
+    journal.close()
+    assert [record["text"] for record in SessionJournal(path).tail(10)] == ["0", "1", "2", "3", "4"]
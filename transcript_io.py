@@ -0,0 +1,256 @@
+# transcript_io.py
+# Streaming conversation import/export: text, JSON, JSONL and a compact binary format
+#
+# Readers are generators and writers accept any iterable, so converting a
+# transcript never holds more than one message in memory.
+
+import argparse
+import json
+import os
+import re
+import struct
+import sys
+
+FORMATS = {".txt": "txt", ".json": "json", ".jsonl": "jsonl", ".tbin": "bin"}
+
+# "[12:00:00] You: text" or " You: text" (no timestamp); continuation lines are
+# indented by two spaces, or anything else that doesn't look like a header
+HEADER_RE = re.compile(r"^(?:\[([^\]\n]*)\] | (?=\S))([^:\n]{1,32}): ?(.*)$")
+INDENT = "  "
+
+# Binary layout: MAGIC, then per message (sender ref, time length, text length)
+# followed by the bytes. Sender ref 0 introduces a new name inline (length-prefixed);
+# the first 255 distinct names get refs 1..255 after that.
+MAGIC = b"TUTB\x01"
+RECORD = struct.Struct("<BBI")
+MAX_SENDERS = 255
+
+
+def detect_format(path):
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unknown transcript format: {path}")
+    return fmt
+
+
+def _message(sender, text, time_str):
+    return {"sender": sender, "text": text, "time": time_str}
+
+
+# === Text ===
+
+def _read_txt(f):
+    current = None
+    for line in f:
+        line = line.rstrip("\r\n")
+        match = HEADER_RE.match(line)
+        if match:
+            if current is not None:
+                current["text"] = current["text"].rstrip("\n")
+                yield current
+            time_str, sender, text = match.groups()
+            current = _message(sender, text, time_str or "")
+        elif current is not None:
+            current["text"] += "\n" + (line[len(INDENT):] if line.startswith(INDENT) else line)
+        elif line.strip():
+            # Text before the first header, as in hand-written files
+            current = _message("User", line.strip(), "")
+    if current is not None:
+        current["text"] = current["text"].rstrip("\n")
+        yield current
+
+
+def _write_txt(f, messages, timestamps):
+    count = 0
+    for msg in messages:
+        ts = f"[{msg['time']}]" if timestamps else ""
+        text = msg["text"].replace("\n", "\n" + INDENT)
+        f.write(f"{ts} {msg['sender']}: {text}\n")
+        count += 1
+    return count
+
+
+# === JSON and JSONL ===
+
+def _read_json(f, chunk_size=1 << 16):
+    # Incremental parse of a top-level array, one element at a time
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("JSON transcript must be an array of messages")
+    pos = 1
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            msg, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError("Malformed JSON transcript") from None
+            # The element runs past the buffer: drop what was consumed and read more
+            more = f.read(chunk_size)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        yield msg
+        pos = end
+
+
+def _write_json(f, messages):
+    count = 0
+    f.write("[")
+    for msg in messages:
+        f.write(",\n  " if count else "\n  ")
+        f.write(json.dumps(msg, ensure_ascii=False))
+        count += 1
+    f.write("\n]\n" if count else "]\n")
+    return count
+
+
+def _read_jsonl(f):
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _write_jsonl(f, messages):
+    count = 0
+    for msg in messages:
+        f.write(json.dumps(msg, ensure_ascii=False, separators=(",", ":")))
+        f.write("\n")
+        count += 1
+    return count
+
+
+# === Binary ===
+
+def _read_exact(f, n):
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("Truncated binary transcript")
+    return data
+
+
+def _read_bin(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a binary transcript")
+    senders = []
+    while True:
+        header = f.read(RECORD.size)
+        if not header:
+            return
+        if len(header) != RECORD.size:
+            raise ValueError("Truncated binary transcript")
+        ref, time_len, text_len = RECORD.unpack(header)
+        if ref == 0:
+            sender = _read_exact(f, _read_exact(f, 1)[0]).decode("utf-8")
+            if len(senders) < MAX_SENDERS:
+                senders.append(sender)
+        else:
+            sender = senders[ref - 1]
+        time_str = _read_exact(f, time_len).decode("utf-8")
+        text = _read_exact(f, text_len).decode("utf-8")
+        yield _message(sender, text, time_str)
+
+
+def _write_bin(f, messages):
+    f.write(MAGIC)
+    senders = {}
+    count = 0
+    for msg in messages:
+        sender = msg["sender"]
+        time_bytes = msg.get("time", "").encode("utf-8")
+        text = msg["text"].encode("utf-8")
+        ref = senders.get(sender, 0)
+        f.write(RECORD.pack(ref, len(time_bytes), len(text)))
+        if not ref:
+            name = sender.encode("utf-8")[:255]
+            f.write(bytes([len(name)]) + name)
+            if len(senders) < MAX_SENDERS:
+                senders[sender] = len(senders) + 1
+        f.write(time_bytes)
+        f.write(text)
+        count += 1
+    return count
+
+
+# === Public API ===
+
+def read_messages(path, fmt=None):
+    """Yields message dicts ({"sender", "text", "time"}) from a transcript file."""
+    fmt = fmt or detect_format(path)
+    if fmt == "bin":
+        with open(path, "rb", buffering=1 << 16) as f:
+            yield from _read_bin(f)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        if fmt == "txt":
+            yield from _read_txt(f)
+        elif fmt == "json":
+            yield from _read_json(f)
+        else:
+            yield from _read_jsonl(f)
+
+
+def write_messages(path, messages, fmt=None, timestamps=True):
+    """Writes any iterable of messages; returns the number written.
+
+    timestamps only affects the text format. The file is written next to
+    the target and renamed into place, so a failed export leaves no partial file.
+    """
+    fmt = fmt or detect_format(path)
+    tmp = path + ".tmp"
+    try:
+        if fmt == "bin":
+            with open(tmp, "wb", buffering=1 << 16) as f:
+                count = _write_bin(f, messages)
+        else:
+            with open(tmp, "w", encoding="utf-8", buffering=1 << 16) as f:
+                if fmt == "txt":
+                    count = _write_txt(f, messages, timestamps)
+                elif fmt == "json":
+                    count = _write_json(f, messages)
+                else:
+                    count = _write_jsonl(f, messages)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+
+def convert(src, dst, src_fmt=None, dst_fmt=None, timestamps=True):
+    return write_messages(dst, read_messages(src, src_fmt), dst_fmt, timestamps)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert conversation transcripts between formats.")
+    parser.add_argument("files", nargs="+", help="transcripts to convert (.txt, .json, .jsonl, .tbin)")
+    parser.add_argument("--to", required=True, choices=sorted(FORMATS), help="target extension, e.g. .jsonl")
+    parser.add_argument("--out-dir", help="directory for converted files (default: next to each input)")
+    parser.add_argument("--no-timestamps", action="store_true", help="omit timestamps in .txt output")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for src in args.files:
+        base = os.path.splitext(os.path.basename(src))[0] + args.to
+        dst = os.path.join(args.out_dir or os.path.dirname(src), base)
+        if os.path.abspath(dst) == os.path.abspath(src):
+            print(f"skip {src}: already {args.to}")
+            continue
+        try:
+            count = convert(src, dst, timestamps=not args.no_timestamps)
+        except (OSError, ValueError) as e:
+            print(f"error {src}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        print(f"{src} -> {dst} ({count} messages)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
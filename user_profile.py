@@ -1,15 +1,64 @@
 # user_profile.py
 
+import datetime
+from array import array
+
+from context_manager import ConversationContext
+from message_store import MessageStore
+
+
 class UserProfile:
-    def __init__(self, name):
+    def __init__(self, name, archive=None, messages=None):
         self.name = name
-        self.session_history = []
+        # Question/answer turns are (question, response) index pairs into a message_store.MessageStore,
+        # usually the one the GUI shows, so the text is only held once
+        self.messages = messages if messages is not None else MessageStore()
+        self._turns = array("L")
+        self._turns_generation = self.messages.generation
+        # Optional session_archive.SessionArchive; history is kept in memory only without it
+        self.archive = archive
+        self.session_id = None
+        self.session_subject = None
+        # Recent turns plus a rolling summary, sent along with each new question
+        self.context = ConversationContext()
 
-    def add_to_history(self, question, response):
-        self.session_history.append({
-            "question": question,
-            "response": response
-        })
+    def add_to_history(self, question, response, subject=None, indices=None):
+        # indices: where the question and response already sit in self.messages, if they do,
+        # or () to keep the turn out of the history (it is still archived)
+        if self._turns_generation != self.messages.generation:
+            self._turns = array("L")  # the conversation was replaced; old indices are meaningless
+            self._turns_generation = self.messages.generation
+        if indices is None:
+            indices = (self.messages.append("You", question), self.messages.append("Bot", response))
+        self._turns.extend(indices)
+        self.context.add_turn(question, response)
+        if self.archive is None:
+            return
+        # A change of subject starts a new archived session
+        if self.session_id is None or subject != self.session_subject:
+            self.end_session()
+            self.session_id = self.archive.start_session(self.name, subject)
+            self.session_subject = subject
+        now = datetime.datetime.now().strftime("%H:%M:%S")
+        self.archive.add_messages(self.session_id, [
+            {"sender": "You", "text": question, "time": now},
+            {"sender": "Bot", "text": response, "time": now},
+        ])
+
+    def end_session(self):
+        if self.archive is not None and self.session_id is not None:
+            self.archive.end_session(self.session_id)
+        self.session_id = None
 
     def get_history(self):
-        return self.session_history
+        if self._turns_generation != self.messages.generation:
+            return []
+        turns = self._turns
+        return [{"question": self.messages.text(turns[i]), "response": self.messages.text(turns[i + 1])}
+                for i in range(0, len(turns), 2)]
+
+    def past_sessions(self, subject=None, since=None, until=None, before=None, limit=20):
+        # One page of this user's archived sessions; see SessionArchive.list_sessions
+        if self.archive is None:
+            return [], None
+        return self.archive.list_sessions(self.name, subject, since, until, before, limit)